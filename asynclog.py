@@ -0,0 +1,89 @@
+"""
+Asynchronous logging.
+
+Log records are put on a bounded in-memory queue by the simulation
+thread and written to their file handlers by a background thread in
+batches, with one flush per batch, so disk latency does not stall the
+round loop. flush() waits until everything queued so far is on disk.
+"""
+
+import logging
+import queue
+import threading
+
+# records waiting to be written before the simulation blocks
+QUEUE_SIZE = 100000
+# records written between two flushes of the files
+BATCH_SIZE = 1000
+
+
+class QueueForwardHandler(logging.Handler):
+    # puts records for the target handler on the writer queue
+    def __init__(self, writer, target):
+        super().__init__(target.level)
+        self.writer = writer
+        self.target = target
+
+    def emit(self, record):
+        self.writer.queue.put((self.target, record))
+
+
+class AsyncLogWriter:
+    def __init__(self, maxsize=QUEUE_SIZE, batch_size=BATCH_SIZE):
+        self.queue = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.thread = None
+
+    def handler_for(self, target):
+        return QueueForwardHandler(self, target)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self._run, name="log-writer", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            # take what is already waiting, up to a batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = self._write(batch)
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
+
+    @staticmethod
+    def _write(batch):
+        targets = set()
+        stop = False
+        for item in batch:
+            if item is None:
+                stop = True
+                continue
+            target, record = item
+            try:
+                target.stream.write(target.format(record) + target.terminator)
+                targets.add(target)
+            except Exception:
+                target.handleError(record)
+        for target in targets:
+            target.flush()
+        return stop
+
+    def flush(self):
+        # wait until all queued records are written
+        if self.thread is not None:
+            self.queue.join()
+
+    def stop(self):
+        # write what is left and end the writer thread
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,203 @@
+"""
+Batched RLNC decoding over GF(2^q).
+
+The coefficient matrices (and optionally the payloads) of all decoders
+are kept as one stacked NumPy tensor in reduced row echelon form, so the
+packets received by many decoders in a round are reduced together with
+batched row operations instead of one binding call per packet.
+"""
+
+import numpy as np
+
+# Same primitive polynomials as the fifi fields used by kodo
+PRIMITIVE_POLYS = {
+    1: 0b11,
+    4: 0b10011,
+    8: 0b100011101,
+    16: 0b10001000000001011
+}
+
+# finite field name (as in config.json) to field degree
+FIELD_DEGREES = {
+    "binary16": 16,
+    "binary8": 8,
+    "binary4": 4,
+    "binary": 1
+}
+
+# max number of elements of a temporary product tensor
+CHUNK_ELEMENTS = 1 << 22
+
+
+class GaloisField:
+    def __init__(self, degree):
+        self.degree = degree
+        self.size = 2 ** degree
+        self.order = self.size - 1
+        self.dtype = np.uint8 if degree <= 8 else np.uint16
+
+        # exp table is extended with zeros so that log(0) can point there
+        # and any product with zero is looked up as zero
+        self.exp = np.zeros(4 * self.order + 1, dtype=self.dtype)
+        self.log = np.zeros(self.size, dtype=np.int64)
+        x = 1
+        for i in range(self.order):
+            self.exp[i] = x
+            self.log[x] = i
+            x <<= 1
+            if x & self.size:
+                x ^= PRIMITIVE_POLYS[degree]
+        self.exp[self.order:2 * self.order] = self.exp[:self.order]
+        self.log[0] = 2 * self.order
+
+    def mul(self, a, b):
+        return self.exp[self.log[a] + self.log[b]]
+
+    def inv(self, a):
+        return self.exp[self.order - self.log[a]]
+
+    def matmul(self, coefficients, rows):
+        # (..., k) x (k, w) -> (..., w)
+        coefficients = np.asarray(coefficients)
+        flat = coefficients.reshape(-1, coefficients.shape[-1])
+        out = np.zeros((len(flat), rows.shape[-1]), dtype=self.dtype)
+        step = max(1, CHUNK_ELEMENTS // max(1, rows.size))
+        for i in range(0, len(flat), step):
+            prod = self.mul(flat[i:i + step, :, None], rows[None, :, :])
+            out[i:i + step] = np.bitwise_xor.reduce(prod, axis=1)
+        return out.reshape(*coefficients.shape[:-1], rows.shape[-1])
+
+    def from_bytes(self, data):
+        # (..., nbytes) uint8 -> (..., elements) of this field
+        data = np.asarray(data, dtype=np.uint8)
+        if self.degree == 8:
+            return data.copy()
+        if self.degree == 4:
+            return np.stack([data & 0x0F, data >> 4], axis=-1).reshape(
+                *data.shape[:-1], -1)
+        if self.degree == 1:
+            return np.unpackbits(data, axis=-1)
+        if data.shape[-1] % 2:
+            pad = np.zeros((*data.shape[:-1], 1), dtype=np.uint8)
+            data = np.concatenate([data, pad], axis=-1)
+        return np.ascontiguousarray(data).view("<u2").astype(self.dtype)
+
+    def to_bytes(self, elements, nbytes):
+        # inverse of from_bytes
+        elements = np.asarray(elements, dtype=self.dtype)
+        if self.degree == 8:
+            data = elements.astype(np.uint8)
+        elif self.degree == 4:
+            pairs = elements.reshape(*elements.shape[:-1], -1, 2)
+            data = (pairs[..., 0] | (pairs[..., 1] << 4)).astype(np.uint8)
+        elif self.degree == 1:
+            data = np.packbits(elements.astype(np.uint8), axis=-1)
+        else:
+            data = np.ascontiguousarray(elements.astype("<u2")).view(np.uint8)
+        return data[..., :nbytes]
+
+
+class BatchDecoder:
+    def __init__(self, field, decoders, symbols, payload_size=0):
+        self.field = field
+        self.decoders = decoders
+        self.symbols = symbols
+        self.payload_size = payload_size
+        self.width = symbols + payload_size
+
+        # rows[d, j] holds the row with pivot j, in reduced echelon form
+        self.rows = np.zeros((decoders, symbols, self.width), dtype=field.dtype)
+        self.pivots = np.zeros((decoders, symbols), dtype=bool)
+        self.ranks = np.zeros(decoders, dtype=np.int64)
+
+        # decoded symbols, updated only for decoders whose rows changed
+        self.decoded_map = np.zeros((decoders, symbols), dtype=bool)
+        self.decoded_count = np.zeros(decoders, dtype=np.int64)
+        self.changed = np.zeros(decoders, dtype=bool)
+
+    def consume(self, decoder_ids, vectors):
+        """
+        Consume one coded vector per entry of decoder_ids
+
+        vectors are [coefficients | payload] rows, several vectors may go
+        to the same decoder, they are applied one layer at a time
+        """
+        decoder_ids = np.asarray(decoder_ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=self.field.dtype)
+        if not len(decoder_ids):
+            return
+
+        # occurrence number of every decoder id gives its layer
+        order = np.argsort(decoder_ids, kind="stable")
+        sorted_ids = decoder_ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        lengths = np.diff(np.r_[starts, len(order)])
+        layer = np.empty(len(order), dtype=np.int64)
+        layer[order] = np.arange(len(order)) - np.repeat(starts, lengths)
+
+        for k in range(int(layer.max()) + 1):
+            sel = np.flatnonzero(layer == k)
+            # skip complete decoders
+            sel = sel[self.ranks[decoder_ids[sel]] < self.symbols]
+            step = max(1, CHUNK_ELEMENTS // (self.symbols * self.width))
+            for i in range(0, len(sel), step):
+                chunk = sel[i:i + step]
+                self.consume_layer(decoder_ids[chunk], vectors[chunk])
+
+    def consume_systematic(self, decoder_ids, indices, payloads=None):
+        # uncoded symbol of the given index
+        vectors = np.zeros((len(decoder_ids), self.width), dtype=self.field.dtype)
+        vectors[np.arange(len(decoder_ids)), indices] = 1
+        if payloads is not None:
+            vectors[:, self.symbols:] = payloads
+        self.consume(decoder_ids, vectors)
+
+    def consume_layer(self, ids, vectors):
+        # one vector per decoder, the decoders are distinct and not complete
+        gf = self.field
+        n = self.symbols
+        rows = self.rows[ids]
+
+        # remove the known pivots, rows are reduced so all at once
+        coefficients = np.where(self.pivots[ids], vectors[:, :n], 0)
+        vectors = vectors ^ np.bitwise_xor.reduce(
+            gf.mul(coefficients[:, :, None], rows), axis=1)
+
+        # first nonzero coefficient left is the new pivot
+        nonzero = vectors[:, :n] != 0
+        innovative = nonzero.any(axis=1)
+        if not innovative.any():
+            return
+        ids = ids[innovative]
+        rows = rows[innovative]
+        vectors = vectors[innovative]
+        pivot = np.argmax(nonzero[innovative], axis=1)
+        m = np.arange(len(ids))
+
+        # normalize, then eliminate the pivot column from the other rows
+        vectors = gf.mul(gf.inv(vectors[m, pivot])[:, None], vectors)
+        rows ^= gf.mul(rows[m, :, pivot][:, :, None], vectors[:, None, :])
+        rows[m, pivot] = vectors
+
+        self.rows[ids] = rows
+        self.pivots[ids, pivot] = True
+        self.ranks[ids] += 1
+
+        # pivot rows with no other coefficient left are decoded symbols
+        weights = np.count_nonzero(rows[:, :, :n], axis=2)
+        decoded = self.pivots[ids] & (weights == 1)
+        self.decoded_map[ids] = decoded
+        self.decoded_count[ids] = decoded.sum(axis=1)
+        self.changed[ids] = True
+
+    def is_complete(self):
+        return self.ranks == self.symbols
+
+    def pop_changed(self):
+        # decoders changed since the last call
+        changed = np.flatnonzero(self.changed)
+        self.changed[:] = False
+        return changed
+
+    def payloads(self):
+        return self.rows[:, :, self.symbols:]
@@ -0,0 +1,233 @@
+"""
+Microbenchmarks of the simulation hot paths.
+
+Times cde.draw_coefficients, cde.round_packets, cde.node_broadcast,
+channel.channel_stage, cde.round_receive, cde.calculate_aod,
+cde.get_ranks, NCSim.discover_network and
+NCSim.draw_network("random") for every combination of node counts and
+packet sizes. The modules read their configuration on import, so every
+case runs headless in a fresh process with its own config file. Without
+the kodo bindings, the "kodo" codec runs on the NumPy stand-in in
+kodo_standin.py.
+
+usage: python bench.py [--nodes 10 20 40] [--packet-sizes 10 100]
+                       [--decoding kodo batched] [--codec kodo numpy]
+                       [--output logs/bench.json] [--compare old.json]
+
+With --compare, the medians are compared per case to an earlier results
+file and the exit status is 1 if any got slower than the threshold.
+"""
+
+import argparse
+import contextlib
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# rounds run per repetition of a generation
+ROUNDS = 5
+# repetitions, i.e. fresh generations or network layouts
+REPEAT = 5
+# slower median than the compared results, as a fraction
+THRESHOLD = 0.1
+
+
+def import_kodo():
+    # the real bindings if they are built, else the stand-in
+    try:
+        import kodo
+        return "bindings"
+    except ImportError:
+        import kodo_standin
+        sys.modules["kodo"] = kodo_standin
+        return "stand-in"
+
+
+def case_config(base, nodes, packet_size, decoding, codec, log_dir):
+    cfg = copy.deepcopy(base)
+    params = cfg.setdefault("Parameters", {})
+    params.update({"nodes_num": nodes, "packet_size_bytes": packet_size})
+    if decoding:
+        params["decoding"] = decoding
+    if codec:
+        params["codec"] = codec
+    sim = cfg.setdefault("Simulation", {})
+    # no screen and no extra outputs, one process
+    sim.update({"auto_run_all": "cli", "log_path": log_dir, "workers": 1,
+                "replay": False})
+    return cfg
+
+
+def summary(samples, calls):
+    # seconds per sample, each sample covers calls calls
+    samples = np.asarray(samples)
+    return {"calls": calls, "samples": len(samples),
+            "min": float(samples.min()), "median": float(np.median(samples)),
+            "mean": float(samples.mean())}
+
+
+def run_case(cfg_path, rounds, repeat):
+    # runs in a fresh process, the modules read NCSIM_CONFIG on import
+    os.environ["NCSIM_CONFIG"] = cfg_path
+    kodo = import_kodo()
+    with open(os.devnull, "w") as out, contextlib.redirect_stdout(out):
+        import cde
+        import channel
+        import ncsim
+        sim = ncsim.NCSim()
+        n = ncsim.NUM_OF_NODES
+        times = {}
+
+        def timed(name, fun, *args, **kwargs):
+            start = time.perf_counter()
+            result = fun(*args, **kwargs)
+            times.setdefault(name, []).append(time.perf_counter() - start)
+            return result
+
+        for _ in range(repeat):
+            timed("NCSim.draw_network", sim.draw_network, "random")
+            timed("NCSim.discover_network", sim.discover_network)
+
+        for _ in range(repeat):
+            sim.gen_clean_up()
+            cde.generate_data()
+            for r in range(1, rounds + 1):
+                # tx phase, a sample of the per node calls covers every node
+                order = np.random.permutation(sim.nodes)
+                start = time.perf_counter()
+                for node in order:
+                    node.set_sending_channel(np.random.randint(node.ch_num),
+                                             np.random.randint(node.ts_num))
+                    cde.draw_coefficients(node.node_id)
+                times.setdefault("cde.draw_coefficients", []).append(
+                    time.perf_counter() - start)
+                timed("cde.round_packets", cde.round_packets,
+                      [node.node_id for node in order])
+                start = time.perf_counter()
+                for node in order:
+                    cde.node_broadcast(node, node.get_neighbors(), r,
+                                       _logger=ncsim.kpi, _events=ncsim.events)
+                times.setdefault("cde.node_broadcast", []).append(
+                    time.perf_counter() - start)
+
+                channels, timeslots = np.array(
+                    [node.sending_channel for node in sim.nodes]).T
+                (rx_src, rx_dst, rx_heu_only), _ = timed(
+                    "channel.channel_stage", channel.channel_stage,
+                    sim.link_src, sim.link_dst, channels, timeslots, cde.tx_sent[2],
+                    n, ncsim.PACKET_LOSS, ncsim.CFG_KODO["duplex"],
+                    ncsim.CFG_KODO["rx_multi"], ncsim.NODE_BUFFER_SIZE)
+                timed("cde.round_receive", cde.round_receive, rx_src, rx_dst,
+                      rx_heu_only, r, _logger=ncsim.kpi, _events=ncsim.events)
+                timed("cde.calculate_aod", cde.calculate_aod, r,
+                      _logger=ncsim.kpi, _events=ncsim.events)
+
+                start = time.perf_counter()
+                for i in range(n):
+                    cde.get_ranks(i)
+                times.setdefault("cde.get_ranks", []).append(time.perf_counter() - start)
+        ncsim.stop_logs()
+
+    calls = {"cde.draw_coefficients": n, "cde.node_broadcast": n, "cde.get_ranks": n}
+    return kodo, {name: summary(samples, calls.get(name, 1))
+                   for name, samples in times.items()}
+
+
+def run_bench(base, nodes, packet_sizes, decodings=(None,), codecs=(None,),
+              rounds=ROUNDS, repeat=REPEAT):
+    cases = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for num, size, decoding, codec in itertools.product(
+                nodes, packet_sizes, decodings, codecs):
+            log_dir = os.path.join(tmp, f"n{num}_p{size}_{decoding}_{codec}")
+            os.makedirs(log_dir)
+            cfg_path = os.path.join(log_dir, "config.json")
+            cfg = case_config(base, num, size, decoding, codec, log_dir + os.sep)
+            with open(cfg_path, "w") as f:
+                json.dump(cfg, f, indent=2)
+            # one case at a time so they do not compete for the cores
+            with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+                kodo, results = pool.apply(run_case, (cfg_path, rounds, repeat))
+            params = cfg["Parameters"]
+            cases.append({"nodes": num, "packet_size": size,
+                          "decoding": params.get("decoding", "kodo"),
+                          "codec": params.get("codec", "kodo"),
+                          "payload_mode": params.get("payload_mode", "full"),
+                          "fifi": params.get("fifi", "binary"),
+                          "kodo": kodo, "results": results})
+            print(f"nodes {num} packet size {size} {cases[-1]['decoding']} "
+                  f"{cases[-1]['codec']}: " + ", ".join(
+                f"{name} {result['median'] * 1e3:.3f} ms"
+                for name, result in results.items()))
+    return {"created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "rounds": rounds, "repeat": repeat,
+            "cases": cases}
+
+
+def case_key(case):
+    return (case["nodes"], case["packet_size"], case["decoding"], case["codec"],
+            case["payload_mode"], case["fifi"])
+
+
+def compare(new, old, threshold=THRESHOLD):
+    # median ratios of the cases and paths found in both results
+    old_cases = {case_key(case): case for case in old["cases"]}
+    slower = []
+    for case in new["cases"]:
+        before = old_cases.get(case_key(case))
+        if before is None:
+            continue
+        for name, result in case["results"].items():
+            if name not in before["results"]:
+                continue
+            ratio = result["median"] / max(before["results"][name]["median"], 1e-12)
+            mark = ""
+            if ratio > 1 + threshold:
+                mark = " slower"
+                slower.append((case_key(case), name))
+            elif ratio < 1 - threshold:
+                mark = " faster"
+            print(f"nodes {case['nodes']:4} packet size {case['packet_size']:5} "
+                  f"{case['decoding']:8} {case['codec']:6} {name:24} "
+                  f"{before['results'][name]['median'] * 1e3:10.3f} ms -> "
+                  f"{result['median'] * 1e3:10.3f} ms x{ratio:.2f}{mark}")
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="NCSim hot path benchmarks")
+    parser.add_argument("--config", default="config.json", help="base config file")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10, 20, 40])
+    parser.add_argument("--packet-sizes", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--decoding", nargs="+", default=[None],
+                        help="kodo and/or batched, defaults to the config's")
+    parser.add_argument("--codec", nargs="+", default=[None],
+                        help="kodo and/or numpy, defaults to the config's")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", default="logs/bench.json", help="results file")
+    parser.add_argument("--compare", default=None, help="earlier results file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    with open(args.config) as base_file:
+        bench = run_bench(json.load(base_file), args.nodes, args.packet_sizes,
+                          args.decoding, args.codec, args.rounds, args.repeat)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(bench, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(bench, json.load(f), args.threshold):
+                sys.exit(1)
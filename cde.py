@@ -3,28 +3,20 @@
 """
 Cooperative data exchange network using network coding.
 
-This file creates kodo for all nodes using kodo for CDE.
+This file creates the encoder and decoders of all nodes for CDE, with
+the codec backend chosen in config.json (see codec.py).
 """
 
 # Cooperative data exchange network
-import json
 import numpy as np
 import string
 import typing
-import kodo
-
-try:
-    # Open the NCSim Config Json file
-    with open('config.json') as json_file:
-        cfg = json.loads(json_file.read())    # Read Content
-
-except Exception as e:
-    cfg = {"unk": "unk"}
-    print('failure to read config.json, running default values')
-    print(e)
-
+import codec
+import instrument
+from batch_decoder import BatchDecoder, GaloisField, FIELD_DEGREES
+from events import broadcast_message, ranks_message, aod_message
 # Fetch Parameters Dictionary
-CFG_PARAM = cfg.get('Parameters', {"unk": "unk"})
+from config import CFG_PARAM
 
 # Fetch KODO related configurations, or set default values.
 # seed value for random generation
@@ -33,44 +25,88 @@ SEED_VALUE = int(CFG_PARAM.get('seed', 0))
 NUM_OF_NODES = int(CFG_PARAM.get("nodes_num", '10'))
 # symbol size or packet size per node
 PACKET_SIZE = int(CFG_PARAM.get("packet_size_bytes", 10))
+# compare decoded payloads to the source data at the end of generations
+VERIFY_AOD = bool(CFG_PARAM.get("verify_aod", False))
 # how many bits identifying each node
 FINITE_FIELD = CFG_PARAM.get("fifi", "binary")
-
-# fifi translation
-fifi = {
-    "binary16": kodo.field.binary16,
-    "binary8": kodo.field.binary8,
-    "binary4": kodo.field.binary4,
-    "binary": kodo.field.binary
-}
-
-fifi_num = {
-    "binary16": 16,
-    "binary8": 8,
-    "binary4": 4,
-    "binary": 2
-}
-
-# Configure kodo parameters
-field = fifi.get(FINITE_FIELD, "binary8")
-field_max = 2 ** int(fifi_num.get(FINITE_FIELD, 8))
+# "full" payloads or "rank_only" coefficient vectors without payloads
+PAYLOAD_MODE = CFG_PARAM.get("payload_mode", "full").lower()
+RANK_ONLY = PAYLOAD_MODE == "rank_only"
+# "kodo" decoders per node from the codec backend or one "batched"
+# decoding engine for all
+DECODING = CFG_PARAM.get("decoding", "kodo").lower()
+# rank only runs always use the batched engine
+BATCHED = DECODING == "batched" or RANK_ONLY
+# "kodo" or "numpy" backend of the per node encoder and decoders
+CODEC = CFG_PARAM.get("codec", "kodo").lower()
+
+# Configure codec parameters
 symbols = NUM_OF_NODES
 symbol_size = PACKET_SIZE
 simple_sparse = [0.5, 0.5]
+# choice of a simple coefficient keeps it below the first cdf value
+simple_cdf = np.cumsum(simple_sparse)
+simple_cdf /= simple_cdf[-1]
+
+# field of the coefficients of every backend and of the batched engine
+gf = GaloisField(FIELD_DEGREES.get(FINITE_FIELD, 8))
+# coefficients are drawn below field_max, one field element each
+field_max = gf.size
+# codec backend, not loaded for the batched engine
+backend = None if BATCHED else codec.get_backend(CODEC)
+# payload elements per symbol, or bytes per coded symbol of the backend
+if RANK_ONLY:
+    payload_size = 0
+elif BATCHED:
+    payload_size = gf.from_bytes(np.zeros(PACKET_SIZE, dtype=np.uint8)).size
+else:
+    payload_size = backend.coded_size(FINITE_FIELD, PACKET_SIZE)
+# bytes of a coded packet on the air, payload and coefficient vector
+PACKET_BYTES = (0 if RANK_ONLY else PACKET_SIZE) + \
+    -(-NUM_OF_NODES * FIELD_DEGREES.get(FINITE_FIELD, 8) // 8)
 
 # Pseudo random seed
 np.random.seed(SEED_VALUE)
 
 # Global scope Create list of encoder and decoder triples
-nodes: typing.List[typing.List[kodo.RLNCDecoder]] = []
+nodes: typing.List[typing.List[codec.Decoder]] = []
 data_in: typing.List[bytearray] = []
 simple_data_out: typing.List[bytearray] = []
 greedy_data_out: typing.List[bytearray] = []
 heuristic_data_out: typing.List[bytearray] = []
-
-# Master encoder
+# batched engine, decoder index is algorithm * NUM_OF_NODES + node
+engine: BatchDecoder
+source_symbols: np.ndarray
+# packets broadcast by every node in the current round
+# per algorithm (simple, greedy, heuristic) and sending node
+tx_coe = np.zeros((3, NUM_OF_NODES, NUM_OF_NODES), dtype=gf.dtype)
+tx_msg = np.zeros((3, NUM_OF_NODES, payload_size),
+                  dtype=gf.dtype if BATCHED else np.uint8)
+tx_sent = np.zeros((3, NUM_OF_NODES), dtype=bool)
+tx_overhead = np.zeros((3, NUM_OF_NODES), dtype=np.int64)
+# random coefficients of the round per node, drawn in transmission order
+code_vectors = np.zeros((NUM_OF_NODES, NUM_OF_NODES), dtype=np.int64)
+simple_keep = np.zeros((NUM_OF_NODES, NUM_OF_NODES), dtype=bool)
+# pivot bitmaps of the per node decoders, updated when decoders change
+pivots = np.zeros((3, NUM_OF_NODES, NUM_OF_NODES), dtype=bool)
+# decoded symbols per algorithm and node, updated when decoders change
+decoded = np.zeros((3, NUM_OF_NODES, NUM_OF_NODES), dtype=bool)
+decoded_count = np.zeros((3, NUM_OF_NODES), dtype=np.int64)
+# nodes with new decoded symbols since the last calculate_aod
+aod_changed = np.zeros(NUM_OF_NODES, dtype=bool)
+# links of the network, a spatial.Adjacency set by set_network
+network = None
+# decoders with full rank per algorithm and node
+complete = np.zeros((3, NUM_OF_NODES), dtype=bool)
+# incomplete neighbour decoders per algorithm and sending node, a node
+# is active for an algorithm while it has any
+pending = np.zeros((3, NUM_OF_NODES), dtype=np.int64)
+
+# Master encoder, not used by the batched engine
 master_data_in: bytearray
-master_encoder = kodo.RLNCEncoder(field, symbols, symbol_size)
+master_encoder: codec.Encoder
+if not BATCHED:
+    master_encoder = backend.encoder(FINITE_FIELD, symbols, symbol_size)
 
 
 def kodo_init():
@@ -80,27 +116,40 @@ def kodo_init():
     global simple_data_out
     global greedy_data_out
     global heuristic_data_out
+    global engine
 
     nodes = []
     data_in = []
     simple_data_out = []
     greedy_data_out = []
     heuristic_data_out = []
+    tx_sent[:] = False
+    decoded[:] = False
+    decoded_count[:] = 0
+    pivots[:] = False
+    reset_active()
+
+    # decoder seeds are drawn on every decoding path, so the rounds of a
+    # seed are the same with per node decoders and the batched engine
+    seeds = [np.random.randint(max(SEED_VALUE, 1)) for _ in range(NUM_OF_NODES)]
+
+    if BATCHED:
+        # one engine for all decoders of all nodes
+        engine = BatchDecoder(gf, 3 * NUM_OF_NODES, symbols, payload_size)
+        return
 
     # init one encoder
     master_encoder.set_seed(SEED_VALUE)
 
-    for _ in range(NUM_OF_NODES):
-        seed = np.random.randint(SEED_VALUE)
-
+    for seed in seeds:
         # init decoders
-        simple_decoder = kodo.RLNCDecoder(field, symbols, symbol_size)
+        simple_decoder = backend.decoder(FINITE_FIELD, symbols, symbol_size)
         simple_decoder.set_seed(seed)
 
-        greedy_decoder = kodo.RLNCDecoder(field, symbols, symbol_size)
+        greedy_decoder = backend.decoder(FINITE_FIELD, symbols, symbol_size)
         greedy_decoder.set_seed(seed)
 
-        heuristic_decoder = kodo.RLNCDecoder(field, symbols, symbol_size)
+        heuristic_decoder = backend.decoder(FINITE_FIELD, symbols, symbol_size)
         heuristic_decoder.set_seed(seed)
 
         # decoder.set_log_callback(callback_function)
@@ -109,6 +158,7 @@ def kodo_init():
 
 def generate_data():
     global master_data_in
+    global source_symbols
 
     # Always clear when new generation
     kodo_init()
@@ -116,18 +166,38 @@ def generate_data():
     # for random message generation
     _alphabet_list = list(string.ascii_uppercase + string.digits)
 
-    # Generate random message
-    for i, decoders, *_ in enumerate(nodes):
-        s_decoder, g_decoder, h_decoder = decoders
+    # Generate random message, also without payloads to keep the random
+    # stream, and so the rounds, of full payload runs with the same seed
+    for i in range(NUM_OF_NODES):
         msg = "IAM{:02}X".format(i) + "".join(
             np.random.choice(_alphabet_list, size=PACKET_SIZE - 6))
-        data_in.append(bytearray(msg, encoding="utf-8"))
+        data_in.append(bytearray(msg[:PACKET_SIZE], encoding="utf-8"))
+
+    if RANK_ONLY:
+        # every decoder starts with its own node coefficient vector
+        own = np.tile(np.arange(NUM_OF_NODES), 3)
+        engine.consume_systematic(np.arange(3 * NUM_OF_NODES), own)
+        update_decoded()
+        return
+
+    master_data_in = bytearray(b"".join(data_in))
+
+    if BATCHED:
+        # every decoder starts with its own node symbol
+        source_symbols = gf.from_bytes(np.frombuffer(
+            master_data_in, dtype=np.uint8).reshape(NUM_OF_NODES, PACKET_SIZE))
+        own = np.tile(np.arange(NUM_OF_NODES), 3)
+        engine.consume_systematic(
+            np.arange(3 * NUM_OF_NODES), own, source_symbols[own])
+        update_decoded()
+        return
+
+    for s_decoder, g_decoder, h_decoder in nodes:
         simple_data_out.append(bytearray(s_decoder.block_size()))
         greedy_data_out.append(bytearray(g_decoder.block_size()))
         heuristic_data_out.append(bytearray(h_decoder.block_size()))
 
     # setup encoders and decoders
-    master_data_in = bytearray(b"".join(data_in))
     master_encoder.set_symbols_storage(master_data_in)
 
     for i, node in enumerate(nodes):
@@ -141,159 +211,229 @@ def generate_data():
         h_decoder.set_symbols_storage(heuristic_data_out[i])
         h_decoder.consume_systematic_symbol(data_in[i], i)
 
-
-def node_broadcast(node, neighbours, rnd, _logger):
-    # get kodo encoder and decoder
-    s_decoder, g_decoder, h_decoder = nodes[node.node_id]
-
-    # Generate random coefficients
-    random_code_vector = np.random.randint(1, field_max, size=NUM_OF_NODES)
-
-    # produce simple packet to broadcast
-    s_pack_coe = [np.random.choice([random_code_vector[sym], 0], p=simple_sparse) if s_decoder.is_symbol_pivot(
-        sym) else 0 for sym in range(NUM_OF_NODES)]
-    s_coe = bytearray(s_pack_coe)
-    s_pack_msg = master_encoder.produce_symbol(s_coe)
-    s_pack = {
-        'msg': s_pack_msg,
-        'coe': s_coe
-    }
-    s_overhead = np.count_nonzero(s_pack_coe) * 8
-
-    # produce greedy packet to broadcast
-    g_pack_coe = [random_code_vector[sym] if g_decoder.is_symbol_pivot(
-        sym) else 0 for sym in range(NUM_OF_NODES)]
-    g_coe = bytearray(g_pack_coe)
-    g_pack_msg = master_encoder.produce_symbol(g_coe)
-    g_pack = {
-        'msg': g_pack_msg,
-        'coe': g_coe
-    }
-    g_overhead = np.count_nonzero(g_pack_coe) * 8
-
-    all_nei_done = True
-    for ngbr in neighbours:
-        _, _, ngbr_h_decoder = nodes[ngbr.node_id]
-        all_nei_done = all_nei_done and ngbr_h_decoder.is_complete()
-
-    # if all neighbors done, shut down
-    if all_nei_done:
+    update_decoded(np.arange(3 * NUM_OF_NODES))
+
+
+def pivot_bitmaps():
+    # is_symbol_pivot per algorithm, node and symbol
+    if BATCHED:
+        return engine.pivots.reshape(3, NUM_OF_NODES, NUM_OF_NODES)
+    return pivots
+
+
+def set_network(adjacency):
+    # links the nodes broadcast on, from the network discovery
+    global network
+    network = adjacency
+    reset_active()
+
+
+def reset_active():
+    # every node is active for every algorithm with its own neighbours
+    complete[:] = False
+    pending[:] = network.degrees if network is not None else 0
+
+
+def set_complete(alg, index):
+    # full rank decoders leave the active sets of the nodes reaching them
+    complete[alg, index] = True
+    if network is not None:
+        for a, i in zip(alg, index):
+            pending[a, network.reachers(i)] -= 1
+
+
+def draw_coefficients(index):
+    # random draws of a node, the same stream as one choice per simple pivot
+    code_vectors[index] = np.random.randint(1, field_max, size=NUM_OF_NODES)
+    s_pivots = pivot_bitmaps()[0, index]
+    simple_keep[index] = False
+    simple_keep[index, s_pivots] = np.random.random_sample(
+        np.count_nonzero(s_pivots)) < simple_cdf[0]
+
+
+def round_packets(order):
+    # packets of the transmitting nodes from their drawn coefficients
+    order = np.asarray(order, dtype=np.int64)
+    with instrument.phase("coefficients"):
+        # coefficients of the pivots, simple keeps each with its probability
+        coe = np.where(pivot_bitmaps()[:, order], code_vectors[order], 0)
+        coe[0] = np.where(simple_keep[order], coe[0], 0)
+        # nonzeros of Coding vector, heuristic + src ID + done 1 bit
+        overhead = np.count_nonzero(coe, axis=-1) * 8
+        overhead[2] += 8 + 1
+        # no neighbour needs the packets of inactive nodes, the heuristic sleeps
+        sent = pending[:, order] > 0
+        overhead[2] *= sent[2]
+        tx_overhead[:, order] = overhead
+        tx_sent[:, order] = sent
+        tx_coe[:, order] = coe
+
+    if RANK_ONLY:
+        return
+    with instrument.phase("produce_symbol"):
+        alg, index = np.nonzero(sent)
+        index = order[index]
+        if BATCHED:
+            tx_msg[alg, index] = gf.matmul(tx_coe[alg, index], source_symbols)
+            return
+        instrument.count("codec.produce_symbol", len(alg))
+        for a, i in zip(alg, index):
+            tx_msg[a, i] = np.frombuffer(master_encoder.produce_symbol(
+                bytearray(tx_coe[a, i].tobytes())), dtype=np.uint8)
+
+
+def node_broadcast(node, neighbours, rnd, _logger, _events=None):
+    # packets were made by round_packets, shut down if all neighbors done
+    if not tx_sent[2, node.node_id]:
         node.node_sleep()
-        h_pack = None
-        h_overhead = 0
-    else:
-        h_pack_coe = [random_code_vector[sym] if h_decoder.is_symbol_pivot(
-            sym) else 0 for sym in range(NUM_OF_NODES)]
-        h_coe = bytearray(h_pack_coe)
-        h_pack_msg = master_encoder.produce_symbol(h_coe)
-        h_pack = {
-            'msg': h_pack_msg,
-            'coe': h_coe
-        }
-        # nonzeros of Coding vector + src ID + done 1 bit
-        h_overhead = np.count_nonzero(h_pack_coe) * 8 + 8 + 1
-
-        # 10 Nodes * 8 bits coe = 80
-
-    # combine all packs
-    pack = (s_pack, g_pack, h_pack)
 
     # update overhead counters
-    node.add_to_overhead([s_overhead, g_overhead, h_overhead])
+    node.add_to_overhead(tx_overhead[:, node.node_id].tolist())
 
     # log data
     # log message and channel
-    _logger.info(
-        "node {:2},tx{:2},broadcast to {} nodes".format(
-            node.node_id, rnd, len(neighbours)))
+    if _events is not None:
+        _events.broadcast(rnd, node.node_id, len(neighbours))
+    else:
+        _logger.info(broadcast_message(node.node_id, rnd, len(neighbours)))
 
-    # print("\nDecoder rank: {}/{}".format(decoder.rank(), symbols))
-    # print(f"Node {i} sending to ", end='')
-    for n in neighbours:
-        # get kodo encoder and decoder of the neighbor
-        # n_i, n_encoder, n_decoder = nodes[n.node_id]
-        # print(f"{n_i:02} ", end='')
-        n.access_rx_buffer(node.node_id, pack, node.sending_channel)
-    # print("")
 
+def round_receive(rx_src, rx_dst, rx_heu_only, rnd, _logger, _events=None):
+    # collided packets only keep the heuristic part
+    delivered = tx_sent[:, rx_src].copy()
+    delivered[:2] &= ~np.asarray(rx_heu_only, dtype=bool)
 
-def node_receive(node, packets, rnd, _logger):
-    s_decoder, g_decoder, h_decoder = nodes[node.node_id]
-    # check if data in buffer
-    log_msg = "node {:2},rx{:2},".format(node.node_id, rnd)
+    rx_packets = np.count_nonzero(delivered)
+    instrument.traffic(rx_packets=rx_packets, rx_bytes=rx_packets * PACKET_BYTES)
+    # decoders which decoded every symbol a packet combines, complete ones
+    # included, have nothing to gain from it
+    alg, link = np.nonzero(delivered)
+    with instrument.phase("innovative"):
+        useless = ~((tx_coe[alg, rx_src[link]] != 0) &
+                    ~decoded[alg, rx_dst[link]]).any(axis=1)
+    delivered[alg[useless], link[useless]] = False
+    instrument.count("rx.not_innovative", np.count_nonzero(useless))
 
     # consume received messages
-    if len(packets) > 0:
-        for _, pkt in packets:
-            s_pkt, g_pkt, h_pkt = pkt
-
-            # heuristic decoder
-            if h_pkt:
-                h_pack, h_coe = h_pkt.values()
-                h_decoder.consume_symbol(h_pack, h_coe)
-
-            # greedy decoder
-            if g_pkt:
-                g_pack, g_coe = g_pkt.values()
-                g_decoder.consume_symbol(g_pack, g_coe)
-
-            # simple decoder
-            if s_pkt:
-                s_pack, s_coe = s_pkt.values()
-                s_decoder.consume_symbol(s_pack, s_coe)
-
-        ranks = get_ranks(node.node_id)
-        _logger.info(
-            log_msg + "Ranks: Simple {} Greedy {} Heuristic {}".format(*ranks))
-
-    # warn if no messages at all
+    if BATCHED:
+        # all packets of the round in one batched reduction
+        alg, link = np.nonzero(delivered)
+        src = rx_src[link]
+        with instrument.phase("consume"):
+            engine.consume(alg * NUM_OF_NODES + rx_dst[link],
+                           np.concatenate([tx_coe[alg, src], tx_msg[alg, src]], axis=1))
+        instrument.count("engine.consume")
+        instrument.count("engine.vectors", len(alg))
+        with instrument.phase("update_decoded"):
+            update_decoded()
+    else:
+        receivers = np.unique(rx_dst[delivered.any(axis=0)])
+        ranks_before = [get_ranks(index) for index in receivers]
+        with instrument.phase("consume_symbol"):
+            for link, (src, dst) in enumerate(zip(rx_src, rx_dst)):
+                # heuristic, greedy then simple decoder
+                for alg in (2, 1, 0):
+                    if delivered[alg, link]:
+                        nodes[dst][alg].consume_symbol(
+                            bytearray(tx_msg[alg, src].tobytes()),
+                            bytearray(tx_coe[alg, src].tobytes()))
+        instrument.count("codec.consume_symbol", np.count_nonzero(delivered))
+        # only decoders with a new rank can have new decoded symbols
+        changed = [alg * NUM_OF_NODES + index
+                   for index, before in zip(receivers, ranks_before)
+                   for alg, (old, new) in enumerate(zip(before, get_ranks(index)))
+                   if new != old]
+        with instrument.phase("update_decoded"):
+            update_decoded(changed)
+
+    receivers = np.unique(rx_dst)
+    if _events is not None:
+        if len(receivers):
+            _events.ranks(rnd, receivers, [get_ranks(index) for index in receivers])
+        return
+    for index in receivers:
+        _logger.info(ranks_message(index, rnd, get_ranks(index)))
+
+
+def update_decoded(changed=None):
+    # refresh the decoded symbols of the changed decoders
+    if BATCHED:
+        changed = engine.pop_changed()
+    changed = np.asarray(changed, dtype=np.int64)
+    alg, index = np.divmod(changed, NUM_OF_NODES)
+    before = decoded[alg, index]
+
+    if BATCHED:
+        decoded[alg, index] = engine.decoded_map[changed]
     else:
-        log_msg += "no buffered packets"
-        _logger.warning(log_msg)
-
-
-def calculate_aod(rnd="i", _logger=None):
-    s_aods = []
-    g_aods = []
-    h_aods = []
-
-    for i, s_data, g_data, h_data in zip(range(NUM_OF_NODES),
-                                         simple_data_out, greedy_data_out, heuristic_data_out):
-        s_d_i = [s_data[x:x+PACKET_SIZE]
-                 for x in range(0, len(s_data), PACKET_SIZE)]
-        s_aod = [1 if din == dout else 0 for din, dout in zip(data_in, s_d_i)]
-
-        g_d_i = [g_data[x:x+PACKET_SIZE]
-                 for x in range(0, len(g_data), PACKET_SIZE)]
-        g_aod = [1 if din == dout else 0 for din, dout in zip(data_in, g_d_i)]
-
-        h_d_i = [h_data[x:x+PACKET_SIZE]
-                 for x in range(0, len(h_data), PACKET_SIZE)]
-        h_aod = [1 if din == dout else 0 for din, dout in zip(data_in, h_d_i)]
-
-        s = "{} " * len(s_aod)
-        if _logger:
-            _logger.info(
-                ("node {:2},kp{:2},S_AoD {:2}/{} [" + s + "]").format(
-                    i, rnd, sum(s_aod), len(s_aod), *s_aod)
-            )
-            _logger.info(
-                ("node {:2},kp{:2},G_AoD {:2}/{} [" + s + "]").format(
-                    i, rnd, sum(g_aod), len(g_aod), *g_aod)
-            )
-            _logger.info(
-                ("node {:2},kp{:2},H_AoD {:2}/{} [" + s + "]").format(
-                    i, rnd, sum(h_aod), len(h_aod), *h_aod)
-            )
-        s_aods.append(sum(s_aod)/len(s_aod) * 100)
-        g_aods.append(sum(g_aod)/len(g_aod) * 100)
-        h_aods.append(sum(h_aod)/len(h_aod) * 100)
+        # symbol status is up to date from the rank check in round_receive,
+        # payloads are only compared by verify_aod
+        instrument.count("codec.is_symbol_pivot", len(changed) * NUM_OF_NODES)
+        instrument.count("codec.is_symbol_decoded", len(changed) * NUM_OF_NODES)
+        for a, i in zip(alg, index):
+            decoder = nodes[i][a]
+            pivots[a, i] = [decoder.is_symbol_pivot(sym) for sym in range(NUM_OF_NODES)]
+            decoded[a, i] = [decoder.is_symbol_decoded(sym) for sym in range(NUM_OF_NODES)]
+
+    decoded_count[alg, index] = decoded[alg, index].sum(axis=-1)
+    # AoD lines only for nodes with new decoded symbols
+    aod_changed[index[(decoded[alg, index] != before).any(axis=-1)]] = True
+
+    # decoders that reached full rank
+    if BATCHED:
+        full = engine.ranks[changed] == symbols
+    else:
+        full = np.array([nodes[i][a].is_complete() for a, i in zip(alg, index)], dtype=bool)
+    done = full & ~complete[alg, index]
+    if done.any():
+        set_complete(alg[done], index[done])
+
+
+def calculate_aod(rnd="i", _logger=None, _events=None):
+    # AoD percentages from the decoded symbol counters
+    s_aods, g_aods, h_aods = (decoded_count / NUM_OF_NODES * 100).tolist()
+
+    # log only nodes with new decoded symbols
+    changed = np.flatnonzero(aod_changed)
+    if _events is not None:
+        _events.aod(rnd, changed, decoded[:, changed])
+    elif _logger:
+        for i in changed:
+            for alg, bitmap in enumerate(decoded[:, i].astype(int).tolist()):
+                _logger.info(aod_message(i, rnd, alg, bitmap))
+    aod_changed[:] = False
 
     return s_aods, g_aods, h_aods
 
 
+def verify_aod(_logger=None):
+    # decoded symbols whose payload differs from the source data
+    if RANK_ONLY:
+        return 0
+    if BATCHED:
+        payloads = engine.payloads().reshape(
+            3, NUM_OF_NODES, NUM_OF_NODES, payload_size)
+        correct = (payloads == source_symbols).all(axis=-1)
+    else:
+        correct = np.array([
+            [[data[x*PACKET_SIZE:(x+1)*PACKET_SIZE] == din
+              for x, din in enumerate(data_in)] for data in data_out]
+            for data_out in (simple_data_out, greedy_data_out, heuristic_data_out)])
+    wrong = int(np.count_nonzero(decoded & ~correct))
+
+    if _logger:
+        _logger.info(
+            "totn {},verify,{} decoded symbols differ from source".format(
+                NUM_OF_NODES, wrong))
+    return wrong
+
+
 def get_ranks(index):
+    if BATCHED:
+        return tuple(engine.ranks[index::NUM_OF_NODES].tolist())
     s_decoder, g_decoder, h_decoder = nodes[index]
+    instrument.count("codec.update_symbol_status", 3)
+    instrument.count("codec.rank", 3)
     s_decoder.update_symbol_status()
     g_decoder.update_symbol_status()
     h_decoder.update_symbol_status()
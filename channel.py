@@ -0,0 +1,177 @@
+"""
+Whole-network channel stage.
+
+Runs once per round over every transmission (sender -> neighbor link)
+and applies the same channel effects a node used to apply on its own
+received messages: collisions, heuristic-only survivors, half-duplex
+drops, packet loss, single-rx selection and buffer truncation.
+"""
+
+import logging
+
+import numpy as np
+
+# counters returned by channel_stage, in channel_stage_messages order
+COUNTER_FIELDS = ["total", "success", "collisions", "heu_survived",
+                  "ignored", "lost", "missed"]
+
+
+def group_first(keys, rand):
+    # index of a uniformly random member per group of keys
+    order = np.lexsort((rand, keys))
+    sorted_keys = keys[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return sorted_keys[first], order[first]
+
+
+def channel_stage(src, dst, channels, timeslots, has_heuristic, num_nodes,
+                  packet_loss_percent=0, duplex=False, rx_multi=True,
+                  buffer_size=100):
+    """
+    Apply the channel effects to all transmissions of a round
+
+    PARAMETERS
+    ----------
+    src, dst: sender and receiver node index of every link
+    channels, timeslots: sending channel and timeslot of every node
+    has_heuristic: nodes which sent a heuristic packet this round
+
+    RETURN
+    ------
+    (rx_src, rx_dst, rx_heu_only), counters
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    channels = np.asarray(channels, dtype=np.int64)
+    timeslots = np.asarray(timeslots, dtype=np.int64)
+    has_heuristic = np.asarray(has_heuristic, dtype=bool)
+    num_links = len(src)
+
+    def per_node(mask):
+        return np.bincount(dst[mask], minlength=num_nodes)
+
+    # Total received messages
+    total = np.bincount(dst, minlength=num_nodes)
+
+    # remove collisions, same receiver on same channel and timeslot
+    num_ts = int(timeslots.max()) + 1 if num_links else 1
+    num_slots = (int(channels.max()) + 1) * num_ts if num_links else 1
+    tx_ts = timeslots[src]
+    key = dst * num_slots + channels[src] * num_ts + tx_ts
+    _, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+    freq = counts[inverse]
+    h_freq = np.bincount(inverse, weights=has_heuristic[src])[inverse]
+
+    # survivor msgs from collisions
+    full = freq == 1
+    heu_only = ~full & (h_freq == 1)
+    collided = ~full & ~heu_only
+
+    # node cannot transmit and receive at the same time
+    survived = ~collided
+    if duplex:
+        ignored = np.zeros(num_links, dtype=bool)
+    else:
+        ignored = survived & (tx_ts == timeslots[dst])
+
+    # Weighted random choice of success of fail
+    lost = survived & ~ignored & (
+        np.random.random(num_links) < packet_loss_percent / 100)
+    received = survived & ~ignored & ~lost
+
+    # which packets of the triple are still in each message
+    s_ok = ~heu_only
+    h_ok = has_heuristic[src]
+
+    # node cannot receive on multi-channels at the same time
+    missed = np.zeros(num_nodes, dtype=np.int64)
+    if not rx_multi:
+        cand = np.flatnonzero(received)
+        group = dst[cand] * num_ts + tx_ts[cand]
+        gids, sizes = np.unique(group, return_counts=True)
+        _, sel = group_first(group, np.random.random(len(cand)))
+        sel = cand[sel]
+
+        # heuristic or simple place of the selected msg is empty
+        def pick_extra(mask):
+            picks = np.full(len(gids), -1)
+            sub = cand[mask[cand]]
+            if len(sub):
+                g, first = group_first(group[mask[cand]],
+                                       np.random.random(len(sub)))
+                picks[np.searchsorted(gids, g)] = sub[first]
+            return picks
+
+        h_pick = pick_extra(h_ok & ~s_ok)
+        s_pick = pick_extra(s_ok & ~h_ok)
+        need_h = (h_pick >= 0) & ~h_ok[sel]
+        need_s = ~need_h & (s_pick >= 0) & ~s_ok[sel]
+
+        received = np.zeros(num_links, dtype=bool)
+        received[sel] = True
+        received[h_pick[need_h]] = True
+        received[s_pick[need_s]] = True
+
+        # number of missed messages at same time
+        skipped = sizes - 1 - (need_h | need_s)
+        np.add.at(missed, gids // num_ts, skipped)
+
+    # not all received messages can fit into the buffer
+    kept = np.flatnonzero(received)
+    if len(kept):
+        order = np.lexsort((np.random.random(len(kept)), dst[kept]))
+        kept = kept[order]
+        rx_dst = dst[kept]
+        starts = np.flatnonzero(np.r_[True, rx_dst[1:] != rx_dst[:-1]])
+        lengths = np.diff(np.r_[starts, len(kept)])
+        rank = np.arange(len(kept)) - np.repeat(starts, lengths)
+        kept = kept[rank < buffer_size]
+
+    counters = {
+        "total": total,
+        "success": np.bincount(dst[kept], minlength=num_nodes),
+        "collisions": per_node(collided),
+        "heu_survived": per_node(heu_only),
+        "ignored": per_node(ignored),
+        "lost": per_node(lost),
+        "missed": missed
+    }
+    return (src[kept], dst[kept], heu_only[kept]), counters
+
+
+def channel_stage_messages(i, total, success, collisions, heu_survived,
+                           ignored, lost, missed):
+    # (level, message) summary lines of one node
+    if not total:
+        yield logging.CRITICAL, "node {:2} No available msgs".format(i)
+        return
+    yield logging.INFO, "node {:2} found {:2} msgs".format(i, total)
+    if heu_survived:
+        yield logging.WARNING, "node {:2} heuristic survived {} collisions".format(
+            i, heu_survived)
+    if collisions:
+        yield logging.WARNING, "node {:2} collision discard {} msgs".format(
+            i, collisions)
+    if ignored:
+        yield logging.WARNING, "node {:2} tx discard {} rx msgs".format(
+            i, ignored)
+    if lost:
+        yield logging.WARNING, "node {:2} packet loss {} msgs".format(
+            i, lost)
+    if missed:
+        yield logging.WARNING, "node {:2} multi rx msgs discard {} msgs".format(
+            i, missed)
+    if not success:
+        yield logging.CRITICAL, "node {:2} no msgs survived".format(i)
+    else:
+        yield logging.INFO, "node {:2} {:2} msgs to buffer".format(
+            i, success)
+
+
+def log_channel_stage(counters, logger):
+    # one summary line per effect per node
+    columns = [counters[field].tolist() for field in COUNTER_FIELDS]
+    for i, values in enumerate(zip(*columns)):
+        for level, msg in channel_stage_messages(i, *values):
+            logger.log(level, msg)
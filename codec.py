@@ -0,0 +1,193 @@
+"""
+Codec backends.
+
+cde.py creates the master encoder and the decoders of every node
+through the backend named by "codec" in the Parameters section:
+
+- "kodo": the kodo-python bindings, imported only when selected
+- "numpy": RLNC over GF(2^q) in NumPy, every decoder is a BatchDecoder
+  of one, the same elimination the batched decoding engine runs
+
+Encoders and decoders of both backends have the kodo calls used by
+cde.py, described by the Encoder and Decoder protocols below.
+Coefficient vectors are passed with one field element per coefficient,
+i.e. the bytes of a uint16 array for binary16 and one byte otherwise.
+Coded symbols are coded_size() bytes, the NumPy backend pads odd
+binary16 symbols to whole elements and trims only the decoded symbols.
+"""
+
+import typing
+import numpy as np
+from batch_decoder import BatchDecoder, GaloisField, FIELD_DEGREES
+
+# id of the only decoder of the engine of a NumpyDecoder
+DECODER = np.zeros(1, dtype=np.int64)
+
+
+class Encoder(typing.Protocol):
+    def set_seed(self, seed: int) -> None: ...
+
+    def set_symbols_storage(self, storage: bytearray) -> None: ...
+
+    def produce_symbol(self, coefficients: bytearray) -> bytearray: ...
+
+
+class Decoder(typing.Protocol):
+    def set_seed(self, seed: int) -> None: ...
+
+    def block_size(self) -> int: ...
+
+    def set_symbols_storage(self, storage: bytearray) -> None: ...
+
+    def consume_systematic_symbol(self, symbol: bytearray, index: int) -> None: ...
+
+    def consume_symbol(self, symbol: bytearray, coefficients: bytearray) -> None: ...
+
+    def update_symbol_status(self) -> None: ...
+
+    def rank(self) -> int: ...
+
+    def is_symbol_pivot(self, index: int) -> bool: ...
+
+    def is_symbol_decoded(self, index: int) -> bool: ...
+
+    def is_complete(self) -> bool: ...
+
+
+class KodoBackend:
+    def __init__(self):
+        # the bindings are only needed when this backend is used
+        import kodo
+        self.kodo = kodo
+        self.fields = {
+            "binary16": kodo.field.binary16,
+            "binary8": kodo.field.binary8,
+            "binary4": kodo.field.binary4,
+            "binary": kodo.field.binary
+        }
+
+    def coded_size(self, field, symbol_size):
+        # the bindings produce symbol_size bytes, the stand-in pads like NumPy
+        coded_size = getattr(self.kodo, "coded_size", None)
+        return coded_size(field, symbol_size) if coded_size else symbol_size
+
+    def encoder(self, field, symbols, symbol_size) -> Encoder:
+        return self.kodo.RLNCEncoder(self.fields.get(field, self.fields["binary8"]),
+                                     symbols, symbol_size)
+
+    def decoder(self, field, symbols, symbol_size) -> Decoder:
+        return self.kodo.RLNCDecoder(self.fields.get(field, self.fields["binary8"]),
+                                     symbols, symbol_size)
+
+
+class NumpyEncoder:
+    def __init__(self, gf, symbols, symbol_size):
+        self.field = gf
+        self.symbols = symbols
+        self.symbol_size = symbol_size
+        self.data = None
+
+    def set_seed(self, seed):
+        pass
+
+    def set_symbols_storage(self, storage):
+        data = np.frombuffer(bytes(storage), dtype=np.uint8)
+        self.data = self.field.from_bytes(data.reshape(self.symbols, self.symbol_size))
+
+    def produce_symbol(self, coefficients):
+        coe = np.frombuffer(bytes(coefficients), dtype=self.field.dtype)
+        symbol = self.field.matmul(coe, self.data)
+        # whole elements, a padded binary16 element is not cut in half
+        return bytearray(self.field.to_bytes(symbol, None).tobytes())
+
+
+class NumpyDecoder:
+    def __init__(self, gf, symbols, symbol_size):
+        self.field = gf
+        self.symbols = symbols
+        self.symbol_size = symbol_size
+        payload_size = gf.from_bytes(np.zeros(symbol_size, dtype=np.uint8)).size
+        self.engine = BatchDecoder(gf, 1, symbols, payload_size)
+        # decoded symbols are written here like kodo does
+        self.storage = None
+
+    def set_seed(self, seed):
+        pass
+
+    def block_size(self):
+        return self.symbols * self.symbol_size
+
+    def set_symbols_storage(self, storage):
+        self.storage = np.frombuffer(storage, dtype=np.uint8).reshape(
+            self.symbols, self.symbol_size)
+
+    def consume_systematic_symbol(self, symbol, index):
+        payload = self.field.from_bytes(np.frombuffer(bytes(symbol), dtype=np.uint8))
+        self.engine.consume_systematic([0], [index], payload[None])
+        self._store_decoded()
+
+    def consume_symbol(self, symbol, coefficients):
+        if self.engine.ranks[0] == self.symbols:
+            return
+        coe = np.frombuffer(bytes(coefficients), dtype=self.field.dtype)
+        payload = self.field.from_bytes(np.frombuffer(bytes(symbol), dtype=np.uint8))
+        self.engine.consume_layer(DECODER, np.concatenate([coe, payload])[None])
+        self._store_decoded()
+
+    def _store_decoded(self):
+        # only after a change of the rows
+        if not len(self.engine.pop_changed()) or self.storage is None:
+            return
+        decoded = np.flatnonzero(self.engine.decoded_map[0])
+        self.storage[decoded] = self.field.to_bytes(
+            self.engine.payloads()[0, decoded], self.symbol_size)
+
+    def update_symbol_status(self):
+        pass
+
+    def rank(self):
+        return int(self.engine.ranks[0])
+
+    def is_symbol_pivot(self, index):
+        return bool(self.engine.pivots[0, index])
+
+    def is_symbol_decoded(self, index):
+        return bool(self.engine.decoded_map[0, index])
+
+    def is_complete(self):
+        return bool(self.engine.is_complete()[0])
+
+
+class NumpyBackend:
+    def __init__(self):
+        self.fields = {}
+
+    def galois_field(self, field):
+        degree = FIELD_DEGREES.get(field, 8)
+        if degree not in self.fields:
+            self.fields[degree] = GaloisField(degree)
+        return self.fields[degree]
+
+    def coded_size(self, field, symbol_size):
+        # bytes of the whole field elements of a symbol
+        gf = self.galois_field(field)
+        elements = gf.from_bytes(np.zeros(symbol_size, dtype=np.uint8)).size
+        return gf.to_bytes(np.zeros(elements, dtype=gf.dtype), None).size
+
+    def encoder(self, field, symbols, symbol_size) -> Encoder:
+        return NumpyEncoder(self.galois_field(field), symbols, symbol_size)
+
+    def decoder(self, field, symbols, symbol_size) -> Decoder:
+        return NumpyDecoder(self.galois_field(field), symbols, symbol_size)
+
+
+BACKENDS = {
+    "kodo": KodoBackend,
+    "numpy": NumpyBackend
+}
+
+
+def get_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"unknown codec {name!r}, use one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
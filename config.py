@@ -0,0 +1,31 @@
+"""
+Simulation configuration.
+
+Reads config.json, or the file named by the NCSIM_CONFIG environment
+variable, once per process so that every module shares the same values.
+"""
+
+import json
+import os
+
+CONFIG_PATH = os.environ.get("NCSIM_CONFIG", "config.json")
+
+
+def load_config(path=CONFIG_PATH):
+    try:
+        # Open the NCSim Config Json file
+        with open(path) as json_file:
+            return json.loads(json_file.read())    # Read Content
+
+    except Exception as e:
+        print(f'failure to read {path}, running default values')
+        print(e)
+        return {"unk": "unk"}
+
+
+cfg = load_config()
+
+# Fetch Simulation Dictionary
+CFG_SIM = cfg.get('Simulation', {"unk": "unk"})
+# Fetch Parameters Dictionary
+CFG_PARAM = cfg.get('Parameters', {"unk": "unk"})
@@ -2,15 +2,11 @@ import tkinter as tk
 import tkinter.ttk as ttk
 from turtle import Turtle
 import typing
+from collections import deque
 import numpy as np
-import pandas as pd
-import seaborn as sns
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-plt.style.use('seaborn-deep')
-matplotlib.use('TkAgg')
+import spatial
+from table import VirtualTable
+from graphs import AodGraph, RanksGraph, OverheadGraph, RenderScheduler, MAX_FPS, ALGORITHMS
 
 
 def setup_turtles():
@@ -61,6 +57,10 @@ class MouseClick:
         self.nodes = nodes
         self.turs = [setup_turtles() for _ in range(len(self.nodes))]
         self.focus_node = None
+        # grid over node positions for click lookup
+        self.grid = spatial.GridIndex([n.pos() for n in nodes], 15)
+        # links of the network, set after the discovery
+        self.adjacency = None
 
     def show_coverage(self):
         # self.focus_node.show_coverage()
@@ -89,7 +89,7 @@ class MouseClick:
 
     def show_neighbors(self):
         _, tx_node = self.focus_node
-        rx_nodes = tx_node.get_neighbors()
+        rx_nodes = [self.nodes[i] for i in tx_node.get_neighbors()]
         # draw arrow for all neighbors
         for rx_node in rx_nodes:
             snd_pckt = self.turs[rx_node.node_id]
@@ -103,10 +103,9 @@ class MouseClick:
 
     def hide_neighbors(self):
         _, tx_node = self.focus_node
-        rx_nodes = tx_node.get_neighbors()
         # draw arrow for all neighbors
-        for rx_node in rx_nodes:
-            self.turs[rx_node.node_id].clear()
+        for rx_id in tx_node.get_neighbors():
+            self.turs[rx_id].clear()
 
     def show_all_neighbors(self):
         for n in self.nodes:
@@ -114,10 +113,12 @@ class MouseClick:
             self.show_neighbors()
 
     def show_tx_reachables(self):
-        reachables = []
-        for node in self.nodes:
-            if self.focus_node[0] in [n.node_id for n in node.get_neighbors()]:
-                reachables.append((node.node_id, node))
+        if self.adjacency is not None:
+            reachables = [(i, self.nodes[i])
+                          for i in self.adjacency.reachers(self.focus_node[0])]
+        else:
+            reachables = [(node.node_id, node) for node in self.nodes
+                          if self.focus_node[0] in node.get_neighbors()]
 
         _, node = self.focus_node
         for i_n, n in reachables:
@@ -146,10 +147,9 @@ class MouseClick:
             self.bMenu.post(x_root, y_root)
 
     def get_node(self, pos):
-        dis = [n.distance(pos) for n in self.nodes]
-        nearest_node = self.nodes[dis.index(min(dis))]
-        self.focus_node = (dis.index(min(dis)), nearest_node) if (
-                min(dis) < 15) else None
+        nearest = self.grid.nearest(pos, 15)
+        self.focus_node = (nearest, self.nodes[nearest]) if (
+                nearest is not None) else None
         return self.focus_node
 
     def left_click(self, x, y):
@@ -161,13 +161,8 @@ class MouseClick:
             self.focus_node = self.get_node((x, y))
 
 
-def create_graph(root):
-    fig, ax = plt.subplots()
-
-    canvas = FigureCanvasTkAgg(fig, master=root)
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-    canvas.draw()
-    return ax, canvas
+# reception counters of the node statistics, for the @ 100% AoD ratios
+RX_FIELDS = ('rx_total', 'rx_success', 'rx_collisions', 'rx_ignored', 'rx_missed')
 
 
 def display_data(frame, values, headers=None, assert_empty=False):
@@ -197,16 +192,14 @@ def display_data(frame, values, headers=None, assert_empty=False):
 
 
 class Controller:
-    def __init__(self, master, summ_header, auto_run: str, auto_full, **configs):
+    def __init__(self, master, summ_header, auto_run: str, auto_full, max_fps=MAX_FPS,
+                 **configs):
         self.root = master
         self.summ_header = summ_header
         self.configs = configs
         self.num_nodes = int(configs.get("num_nodes", 0))
         self.cli = auto_run.lower() == "cli"
 
-        # init inside __init__
-        self.df_nodes = pd.DataFrame(columns=self.summ_header)
-
         # Create Header and Tx data
         self.headers_current = ["Round", "SGH Avg Ranks", "SGH Avg AoD",
                                 "SGH Max AoD", "SGH Min AoD", "SGH Nodes 100%", "SGH Nodes <50%"]
@@ -216,13 +209,7 @@ class Controller:
         ranks = [(1, 1, 1) for _ in range(self.num_nodes)]
         stats: typing.Any = None
         self.data = [vals, ranks, stats]
-        self.avg_rank: typing.List[list] = []
-        self.oh_vals = pd.DataFrame()
-        self.sgh_done = {
-            'Simple': False,
-            'Greedy': False,
-            'Heuristic': False
-        }
+        self.reset_accumulators()
 
         # tk variables
         self.is_nxt = tk.BooleanVar(value=False)
@@ -256,15 +243,22 @@ class Controller:
         n.add(self.overhead_frame, text='OH Graph')
         n.add(self.summ_frame, text='KPIs')
         n.pack(fill=tk.BOTH, expand=1)
+        n.bind("<<NotebookTabChanged>>", self.tab_changed)
 
-        self.summ_tree = self.create_summ_tree(self.summ_frame)
+        # node statistics of every round, only the visible rows are Tk items
+        self.summ_table = VirtualTable(self.summ_frame, self.summ_header)
         Radios, self.CB1, btns = self.create_controller(
             auto_run=bool(auto_run), auto_full=auto_full)
         self.R1, self.R2, self.R3 = Radios
         self.btn_nxt_gen, self.btn_nxt_rnd, self.btn_xtr_gen, self.btn_xtr_rnd, self.btn_to_full = btns
-        self.aod_ax, self.aod_canvas = create_graph(self.aod_grph_frame)
-        self.ranks_ax, self.ranks_canvas = create_graph(self.ranks_grph_frame)
-        self.oh_ax, self.oh_canvas = create_graph(self.overhead_frame)
+        self.aod_graph = AodGraph(self.aod_grph_frame, self.num_nodes)
+        self.ranks_graph = RanksGraph(self.ranks_grph_frame, self.num_nodes)
+        self.oh_graph = OverheadGraph(self.overhead_frame, self.num_nodes)
+        # graphs by notebook tab, drawn on first show
+        self.tab_graphs = {str(self.aod_grph_frame): self.aod_graph,
+                           str(self.ranks_grph_frame): self.ranks_graph,
+                           str(self.overhead_frame): self.oh_graph}
+        self.scheduler = RenderScheduler(self.root, list(self.tab_graphs.values()), max_fps)
         self.f_config, self.f_current, self.f_at_tx, self.f_at_100 = self.create_analysis(
             self.stat_frame)
 
@@ -272,44 +266,15 @@ class Controller:
         # update frames with data
         self.update_analysis(self.data)
 
-    def create_summ_tree(self, root):
-        # taking all the columns heading in a variable "df_col".
-        df = self.df_nodes
-        df_col = df.columns.values
-
-        # create scrollbar
-        scroll = ttk.Scrollbar(root)
-        scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        # create tree view
-        tree = ttk.Treeview(root, show='headings', height=7,
-                            yscrollcommand=scroll.set)
-        scroll.config(command=tree.yview)
-        # all the column name are generated dynamically.
-        tree['columns'] = df_col
-
-        # generating for loop to create columns and give heading to them through df_col var.
-        for col, x in enumerate(df_col):
-            tree.column(col, width=50, anchor='e')
-            tree.heading(col, text=x.replace('_', ' '),
-                         command=lambda _col=col: self.treeview_sort_column(tree, _col, False))
-        tree.pack(expand=True, fill=tk.BOTH)
-        return tree
-
-    def update_summ_tree(self, tree, data, fast_run):
-        if data:
-            df = pd.DataFrame(data)
-            self.df_nodes = self.df_nodes.append(df, ignore_index=True)
-
-            if not fast_run:
-                color = "#" + ("%06x" % np.random.randint(12000000, 13000000))
-                # generating for loop to add new values to tree
-                for _, row in df.iterrows():
-                    vals = list(map(int, row.tolist()))
-
-                    # generating for loop to print values of dataframe in treeview column.
-                    tree.insert('', 0, values=vals, tags=color)
-                    tree.tag_configure(color, background=color)
+    def tab_changed(self, event):
+        graph = self.tab_graphs.get(event.widget.select())
+        if graph:
+            graph.show()
 
+    def update_summ_tree(self, data, fast_run):
+        self.summ_table.append(data)
+        if not fast_run:
+            self.summ_table.refresh()
 
     def create_analysis(self, master):
         # Create paned windows
@@ -346,14 +311,34 @@ class Controller:
 
         return f_config, f_current, f_at_tx, f_at_100
 
+    def reset_accumulators(self):
+        # completion flags, kept per generation
+        self.rank_done = {alg: False for alg in ALGORITHMS}
+        self.full_aod = False
+        self.sgh_done = {
+            'Simple': False,
+            'Greedy': False,
+            'Heuristic': False
+        }
+        # reception counters summed over the nodes, of the last rounds
+        self.rx_sums = deque(maxlen=2)
+
     def update_analysis(self, data, oh_vals=False, r_curr=0, r_num=0, r_xtra=1):
         self.data = data
         # Extract data
         vals, ranks, stats = data
 
         avg_ranks = [np.mean(r, dtype=np.uint16) for r in zip(*ranks)]
-        self.avg_rank.append(avg_ranks)
-        is_full_aod = self.avg_rank.count([self.num_nodes]*3) == 1
+        # algorithms reaching full rank this round
+        newly_done = [alg for alg, avg in zip(ALGORITHMS, avg_ranks)
+                      if avg == self.num_nodes and not self.rank_done[alg]]
+        for alg in newly_done:
+            self.rank_done[alg] = True
+        is_full_aod = all(self.rank_done.values()) and not self.full_aod
+        self.full_aod = all(self.rank_done.values())
+        if stats:
+            self.rx_sums.append((r_curr, {name: sum(s[name] for s in stats)
+                                          for name in RX_FIELDS}))
 
         # prepare data vals
         f_dn = []
@@ -390,179 +375,25 @@ class Controller:
             self.show_full_aod_stats(r_curr-1)
         
         # Update tree
-        self.update_summ_tree(self.summ_tree, stats, self.cli)
+        self.update_summ_tree(stats, self.cli)
         
         # for much quicker runs with no GUI delays
         if self.cli:
             return False
 
-        # update other GUIs
-        self.update_hist_graph(vals, r_curr, r_num,
-                               self.aod_ax, self.aod_canvas)
-        self.update_oh_graph(oh_vals, r_curr, r_num)
-        self.update_ranks_graph(ranks, r_curr, r_num, r_xtra,
-                                self.ranks_ax, self.ranks_canvas, oh_vals)
-        return True
-
-    def update_hist_graph(self, vals, rnd, num_of_rnds, ax, canvas):
-        # prepare data
-        s_val, g_val, h_val = vals
-        # Graphs update
-        n_range = list(range(self.num_nodes))
-        ax.clear()  # clear axes from previous plot
-        ax.set_xticks(n_range)
-        ax.set_ylim(0, 100)  # set the y lim to bottom, top
-
-        # Create dataframe
-        df = pd.DataFrame(data=zip(s_val, g_val, h_val), columns=[
-            "simple", "greedy", "heuristic"])
-        df['Nodes'] = n_range
-        data = df.melt('Nodes', var_name='Algorithm',
-                       value_name='Availability of Data percentage')
-
-        # Seaborn Plot
-        sns.barplot(x="Nodes", y='Availability of Data percentage',
-                    hue='Algorithm', data=data, ax=ax)
-        ax.legend(loc='upper center', bbox_to_anchor=(0.5, 1.15),
-                  fancybox=True, shadow=True, ncol=3)
-        # Update title with current round number
-        ax.set_title(
-            f'Availability of data for {self.num_nodes} nodes @ round {rnd}/{num_of_rnds}')
-        # Deploy the plot
-        canvas.draw()
-
-    def update_ranks_graph(self, ranks, r_current, r_num, r_xtra, ax, canvas, oh_data):
-        s_ranks, g_ranks, h_ranks = zip(*self.avg_rank)
-
-        # Dataframes
-        df = pd.DataFrame(ranks, columns=['Simple', 'Greedy', 'Heuristic'])
-        df['Rounds'] = r_current * np.ones(self.num_nodes, dtype=np.uint16)
-
-        # Calculations
-        round_no = r_num + r_xtra
-        x_range = np.arange(0, round_no + 1)
-
-        # Graphs update
-        df_ranks = df.melt(
-            'Rounds', var_name='Algorithm', value_name='Node Ranks')
-        temps = pd.DataFrame([{'Rounds': i, 'Algorithm': 'Simple', 'Node Ranks': -2}
-                              for i in range(r_current)])
-
-        df_ranks = temps.append(df_ranks, ignore_index=True, sort=False)
-
-        sns.boxplot(x="Rounds", y="Node Ranks", hue='Algorithm',
-                    data=df_ranks, ax=ax, flierprops=dict(marker='o', markersize=2))
-        ax.set_xticks(x_range)
-
-        # set the y lim to bottom, top
-        ax.set_ylim(0, self.num_nodes + 1)
-        ax.xaxis.grid(True)
-        ax.yaxis.grid(True)
-
-        # Add a vertical lines
-        if not r_xtra and r_current == r_num:
-            s_res = np.interp(r_num, x_range, s_ranks)
-            g_res = np.interp(r_num, x_range, g_ranks)
-            h_res = np.interp(r_num, x_range, h_ranks)
-
-            ax.axhline(s_res, ls='--', color='tab:blue')
-            ax.text(0.05, s_res + 0.1, "Simple", color='tab:blue')
-
-            ax.axhline(g_res, ls='--', color='tab:green')
-            ax.text(0.05, g_res + 0.1, "Greedy", color='tab:green')
-
-            ax.axhline(h_res, ls='--', color='tab:red')
-            ax.text(0.05, h_res + 0.1, "Heuristic", color='tab:red')
-
-        # Add line when simple complete
-        if s_ranks.count(self.num_nodes) == 1:
-            index = len(s_ranks) - 1
-            ax.axvline(index + 0.2, ls='--', color='tab:blue')
-            ax.text(index + 0.2, 0.1, "Simple done", color='tab:blue',
-                    rotation=270, transform=ax.get_xaxis_text1_transform(0)[0])
-            self.sgh_done['Simple'] = oh_data['Simple']
-
-        # Add line when greedy complete
-        if g_ranks.count(self.num_nodes) == 1:
-            index = len(g_ranks) - 1
-            ax.axvline(index - 0.2, ls='--', color='tab:green')
-            ax.text(index - 0.2, 0.1, "Greedy done", color='tab:green', rotation=270,
-                    transform=ax.get_xaxis_text1_transform(0)[0])
-            self.sgh_done['Greedy'] = oh_data['Greedy']
-
-        # Add line when heuristic complete
-        if h_ranks.count(self.num_nodes) == 1:
-            index = len(h_ranks) - 1
-            ax.axvline(index, ls='--', color='tab:red')
-            ax.text(index, 0.1, "Heuristic done", color='tab:red',
-                    rotation=270, transform=ax.get_xaxis_text1_transform(0)[0])
-            self.sgh_done['Heuristic'] = oh_data['Heuristic']
-
-        # one time graph setup
-        if not r_xtra and not r_current:
-            # Add horizontal lines
-            ax.axhline(self.num_nodes, ls=':', color='r')
-            ax.text(0.1, self.num_nodes + 0.1, "Max Rank", color='r')
-
-            ax.axvline(r_num, ls=':', color='r')
-            ax.text(r_num, 0.1, f"tx = {r_num}", color='r',
-                    rotation=270, transform=ax.get_xaxis_text1_transform(0)[0])
-
-            ax.set_title(
-                f'Average ranks of {self.num_nodes} decoders Vs num of transmissions')
-            leg1 = ax.legend(loc='upper center', bbox_to_anchor=(0.5, 1.15),
-                             fancybox=True, shadow=True, ncol=3)
-            ax.add_artist(leg1)
-
-        ax.legend([], [], frameon=False)
-        canvas.draw()
-
-    def show_hline_oh(self, vals):
-        ax = self.oh_ax
-
-        if vals:
-            ax.xaxis.grid(True)
-            clr = {'Heuristic': 'tab:red',
-                   'Greedy': 'tab:green', 'Simple': 'tab:blue'}
-            # mrg = {'Simple': 0, 'Greedy': 1, 'Heuristic': 2}
-            for k, v in self.sgh_done.items():
-                if v:
-                    v /= 1024
-                    ax.axhline(v, ls=':', color=clr[k])
-                    ax.text(0.5, v + 0.1, f"{k} done", color=clr[k])
-                    # self.sgh_done[k] = -1
-
-    def update_oh_graph(self, oh_vals, rnd, num_of_rnds) -> None:
-
-        ax = self.oh_ax
-        canvas = self.oh_canvas
-
-        # Graphs update
-
+        # update other GUIs, drawn by the render scheduler
+        self.aod_graph.update(vals, r_curr, r_num)
+        self.ranks_graph.update(ranks, r_curr, r_num, r_xtra, avg_ranks)
         if oh_vals:
-            ax.clear()  # clear axes from previous plot
-            ax.set_xticks(np.arange(rnd + 1))
-            # update var
-            long_dict = [{
-                "Rounds": rnd,
-                "Algorithm": alg,
-                "Additive_Overhead_Kbits": add_oh / 1024
-            } for alg, add_oh in oh_vals.items()]
-            # Seaborn Plot
-            self.oh_vals = self.oh_vals.append(
-                long_dict, ignore_index=True, sort=False)
-            sns.lineplot(x="Rounds", y="Additive_Overhead_Kbits",
-                         hue="Algorithm", data=self.oh_vals, ax=ax)
-            self.show_hline_oh(oh_vals)
-
-            # Update title with current round number
-            ax.set_title(
-                f'Avg additive overhead of {self.num_nodes} nodes @ round {rnd}/{num_of_rnds}')
-
-            ax.legend(loc='upper center', bbox_to_anchor=(0.5, 1.15),
-                      fancybox=True, shadow=True, ncol=3)
-        # Deploy the plot
-        canvas.draw()
+            self.oh_graph.update(oh_vals, r_curr, r_num)
+        # mark the round where an algorithm reached full rank
+        for alg in newly_done:
+            self.sgh_done[alg] = oh_vals[alg] if oh_vals else False
+            self.ranks_graph.mark_done(alg, r_curr)
+            if self.sgh_done[alg]:
+                self.oh_graph.mark_done(alg, self.sgh_done[alg])
+        self.scheduler.request()
+        return True
 
     def show_full_aod_stats(self, r_curr):
         # check if frame is empty
@@ -570,13 +401,15 @@ class Controller:
             return False
         # prepare data
         rnds = self.configs.get("num_rounds", 0)
-        df = self.df_nodes.query(f" round == {r_curr}")
+        sums = dict(self.rx_sums).get(r_curr)
+        if not sums:
+            return False
 
         # Calculate ratio
-        reception_ratio = df['rx_success'].sum() / df['rx_total'].sum() * 100
-        collision_ratio = df['rx_collisions'].sum() / df['rx_total'].sum() * 100
-        ignored_ratio = df['rx_ignored'].sum() / df['rx_total'].sum() * 100
-        missed_ratio = df['rx_missed'].sum() / df['rx_total'].sum() * 100
+        reception_ratio = sums['rx_success'] / sums['rx_total'] * 100
+        collision_ratio = sums['rx_collisions'] / sums['rx_total'] * 100
+        ignored_ratio = sums['rx_ignored'] / sums['rx_total'] * 100
+        missed_ratio = sums['rx_missed'] / sums['rx_total'] * 100
 
         # Create header
         headers = ["Num of rounds", "Expected rounds", "Reception success %",
@@ -590,45 +423,25 @@ class Controller:
         display_data(self.f_at_100, values, headers)
         return True
 
-    def treeview_sort_column(self, tv, col, reverse):
-        ltv = [(int(tv.set(k, col)), k) for k in tv.get_children('')]
-        ltv.sort(reverse=reverse)
-
-        # rearrange items in sorted positions
-        for index, (_, k) in enumerate(ltv):
-            tv.move(k, '', index)
-
-        # reverse sort next time
-        tv.heading(col, command=lambda _col=col: self.treeview_sort_column(
-            tv, _col, not reverse))
-
     def new_generation_cleanup(self, clear_frames=True):
         # Clean up
-        self.avg_rank = []
-        self.oh_vals = pd.DataFrame()
-        self.sgh_done = {
-            'Simple': False,
-            'Greedy': False,
-            'Heuristic': False
-        }
+        self.reset_accumulators()
 
-        self.ranks_ax.clear()
-        self.oh_ax.clear()
+        self.ranks_graph.reset()
+        self.oh_graph.reset()
+        self.scheduler.request()
 
-        # Clear dataframe
-        self.df_nodes = pd.DataFrame(columns=self.summ_header)
+        # Clear node statistics
+        self.summ_table.clear()
 
         # clear frames
         if clear_frames:
-            frames = [self.f_at_100, self.summ_frame, self.f_at_tx]
+            frames = [self.f_at_100, self.f_at_tx]
             for frame in frames:
                 # destroy all widgets from frame
                 for widget in frame.winfo_children():
                     widget.destroy()
 
-        # create clean frame
-        self.summ_tree = self.create_summ_tree(self.summ_frame)
-
     def create_controller(self, auto_run, auto_full):
         # Radio buttons
         # Container for Radio buttons
@@ -0,0 +1,248 @@
+"""
+Binary event trace.
+
+The per-round KPI and trace lines (broadcasts, ranks, AoD bitmaps and
+channel stage summaries) are recorded as fixed-width binary records in a
+preallocated buffer and written to file in bulk, instead of formatting a
+text line for each of them. The few remaining text log lines are marked
+in the same stream, so the decoder can rebuild the usual .csv and .log
+views in the original order:
+
+usage: python events.py logs/random_20_Simple_WSN_17
+"""
+
+import logging
+import sys
+import time
+
+import numpy as np
+
+import channel
+
+# file header: magic, version, number of nodes
+MAGIC = b"NCEV"
+VERSION = 1
+HEADER_DTYPE = np.dtype([("magic", "S4"), ("version", "<u4"), ("num_nodes", "<u4")])
+
+# one fixed-width record per event
+EVENT_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("event", "u1"),
+    ("gen", "<u4"),
+    ("round", "<i4"),
+    ("node", "<i4"),
+    ("values", "<i4", (7,))
+])
+
+# event types
+TEXT, BROADCAST, RANKS, AOD, CHANNEL = range(5)
+
+# loggers of the text views, as marked by TEXT events
+KPI, TRACE = 0, 1
+LOGGER_IDS = {"kpi": KPI, "trace": TRACE}
+
+# records kept in memory before a bulk write
+CAPACITY = 1 << 16
+
+ALG_NAMES = "SGH"
+
+
+def broadcast_message(node_id, rnd, count):
+    return "node {:2},tx{:2},broadcast to {} nodes".format(node_id, rnd, count)
+
+
+def ranks_message(node_id, rnd, ranks):
+    return ("node {:2},rx{:2},".format(node_id, rnd) +
+            "Ranks: Simple {} Greedy {} Heuristic {}".format(*ranks))
+
+
+def aod_message(node_id, rnd, alg, bitmap):
+    bitmap = list(bitmap)
+    return ("node {:2},kp{:2},{}_AoD {:2}/{} [" + "{} " * len(bitmap) + "]").format(
+        node_id, rnd, ALG_NAMES[alg], sum(bitmap), len(bitmap), *bitmap)
+
+
+class EventTrace:
+    def __init__(self, files_name, num_nodes, capacity=CAPACITY):
+        self.files_name = files_name
+        self.num_nodes = num_nodes
+        self.row_bytes = (num_nodes + 7) // 8
+        self.records = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.bits = np.zeros((capacity, self.row_bytes), dtype=np.uint8)
+        self.size = 0
+        self.bits_size = 0
+        self.generation = 0
+
+        self.evt_file = open(f"{files_name}.evt", "wb")
+        self.aod_file = open(f"{files_name}.aod", "wb")
+        header = np.array([(MAGIC, VERSION, num_nodes)], dtype=HEADER_DTYPE)
+        self.evt_file.write(header.tobytes())
+
+    def _reserve(self, count):
+        # make room for count records (and AoD rows)
+        if self.size + count > len(self.records) or \
+                self.bits_size + count > len(self.bits):
+            self.flush()
+        if count > len(self.records):
+            self.records = np.zeros(count, dtype=EVENT_DTYPE)
+            self.bits = np.zeros((count, self.row_bytes), dtype=np.uint8)
+
+    def _emit(self, event, rnd, nodes, values=None):
+        nodes = np.atleast_1d(nodes)
+        count = len(nodes)
+        if not count:
+            return
+        self._reserve(count)
+        rec = self.records[self.size:self.size + count]
+        rec["time"] = time.time()
+        rec["event"] = event
+        rec["gen"] = self.generation
+        rec["round"] = rnd
+        rec["node"] = nodes
+        rec["values"] = 0
+        if values is not None:
+            values = np.asarray(values).reshape(count, -1)
+            rec["values"][:, :values.shape[1]] = values
+        self.size += count
+
+    def mark(self, logger_id):
+        # a text line was written to the view of logger_id
+        self._emit(TEXT, -1, [-1], [[logger_id]])
+
+    def broadcast(self, rnd, node_id, count):
+        self._emit(BROADCAST, rnd, [node_id], [[count]])
+
+    def ranks(self, rnd, node_ids, ranks):
+        if not len(node_ids):
+            return
+        self._emit(RANKS, rnd, node_ids, ranks)
+
+    def aod(self, rnd, node_ids, bitmaps):
+        # bitmaps (3, nodes, N) of decoded symbols, S/G/H records per node
+        node_ids = np.asarray(node_ids)
+        if not len(node_ids):
+            return
+        rows = np.asarray(bitmaps, dtype=bool).transpose(1, 0, 2).reshape(
+            -1, self.num_nodes)
+        algs = np.tile(np.arange(3), len(node_ids))
+        self._emit(AOD, rnd, np.repeat(node_ids, 3),
+                   np.stack([algs, rows.sum(axis=1)], axis=1))
+        self.bits[self.bits_size:self.bits_size + len(rows)] = np.packbits(rows, axis=1)
+        self.bits_size += len(rows)
+
+    def channel(self, rnd, counters):
+        values = np.stack([counters[field] for field in channel.COUNTER_FIELDS], axis=1)
+        self._emit(CHANNEL, rnd, np.arange(len(values)), values)
+
+    def flush(self):
+        # bulk write of the buffered records
+        self.evt_file.write(self.records[:self.size].tobytes())
+        self.aod_file.write(self.bits[:self.bits_size].tobytes())
+        self.evt_file.flush()
+        self.aod_file.flush()
+        self.size = 0
+        self.bits_size = 0
+
+    def append_file(self, files_name):
+        # append the events of another trace, e.g. of a worker
+        self.flush()
+        with open(f"{files_name}.evt", "rb") as evt_file:
+            evt_file.seek(HEADER_DTYPE.itemsize)
+            self.evt_file.write(evt_file.read())
+        with open(f"{files_name}.aod", "rb") as aod_file:
+            self.aod_file.write(aod_file.read())
+        self.evt_file.flush()
+        self.aod_file.flush()
+
+    def close(self):
+        self.flush()
+        self.evt_file.close()
+        self.aod_file.close()
+
+
+def read_events(files_name):
+    """
+    Decode an event trace
+
+    RETURN
+    ------
+    records, AoD bitmaps (one bool row per AOD record), number of nodes
+    """
+    with open(f"{files_name}.evt", "rb") as evt_file:
+        header = np.frombuffer(evt_file.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)[0]
+        if header["magic"] != MAGIC:
+            raise ValueError(f"{files_name}.evt is not an event trace")
+        records = np.frombuffer(evt_file.read(), dtype=EVENT_DTYPE)
+    num_nodes = int(header["num_nodes"])
+    packed = np.fromfile(f"{files_name}.aod", dtype=np.uint8).reshape(
+        -1, (num_nodes + 7) // 8)
+    bitmaps = np.unpackbits(packed, axis=1, count=num_nodes).astype(bool)
+    return records, bitmaps, num_nodes
+
+
+def event_lines(rec, bitmap=None):
+    # (logger id, level, function name, message) lines of one record
+    event, rnd, node = int(rec["event"]), int(rec["round"]), int(rec["node"])
+    values = rec["values"].tolist()
+    if event == BROADCAST:
+        return [(KPI, logging.INFO, "node_broadcast", broadcast_message(node, rnd, values[0]))]
+    if event == RANKS:
+        return [(KPI, logging.INFO, "round_receive", ranks_message(node, rnd, values[:3]))]
+    if event == AOD:
+        return [(KPI, logging.INFO, "calculate_aod",
+                 aod_message(node, rnd, values[0], bitmap.astype(int).tolist()))]
+    if event == CHANNEL:
+        return [(TRACE, level, "log_channel_stage", msg)
+                for level, msg in channel.channel_stage_messages(node, *values)]
+    return []
+
+
+def format_kpi(created, func, msg):
+    # same layout as the kpi formatter in ncsim
+    return "{},{:<3d},{:<17},{}".format(
+        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created)),
+        int(created % 1 * 1000), func, msg)
+
+
+def format_trace(created, level, func, msg):
+    # same layout as the trace formatter in ncsim
+    return "{}:{:<10}: {:<16}: {}".format(
+        time.strftime("%Y-%m-%d %H.%M.%S", time.localtime(created)),
+        "[%s]" % logging.getLevelName(level), func, msg)
+
+
+def rebuild_views(files_name):
+    # merge the events and the marked text lines into .csv and .log views
+    records, bitmaps, _ = read_events(files_name)
+    with open(f"{files_name}.evt.csv") as kpi_text, open(f"{files_name}.evt.log") as trace_text:
+        texts = {KPI: kpi_text.readlines(), TRACE: trace_text.readlines()}
+    next_text = {KPI: 0, TRACE: 0}
+    aod_row = 0
+
+    with open(f"{files_name}.csv", "w") as kpi_view, open(f"{files_name}.log", "w") as trace_view:
+        views = {KPI: kpi_view, TRACE: trace_view}
+        for rec in records:
+            event = int(rec["event"])
+            if event == TEXT:
+                logger_id = int(rec["values"][0])
+                views[logger_id].write(texts[logger_id][next_text[logger_id]])
+                next_text[logger_id] += 1
+                continue
+            bitmap = None
+            if event == AOD:
+                bitmap = bitmaps[aod_row]
+                aod_row += 1
+            for logger_id, level, func, msg in event_lines(rec, bitmap):
+                if logger_id == KPI:
+                    views[KPI].write(format_kpi(rec["time"], func, msg) + "\n")
+                else:
+                    views[TRACE].write(format_trace(rec["time"], level, func, msg) + "\n")
+        # text lines without a mark, e.g. of an interrupted run
+        for logger_id, lines in texts.items():
+            views[logger_id].writelines(lines[next_text[logger_id]:])
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:]:
+        rebuild_views(name)
+        print(f"rebuilt {name}.csv and {name}.log")
@@ -0,0 +1,266 @@
+"""
+Controller graphs.
+
+Every graph creates its matplotlib artists once per generation and then
+only updates their data (bar heights, line data). The controller feeds
+new data every round and a RenderScheduler coalesces these updates into
+at most max_fps redraws per second, of the visible notebook tab only.
+The plotted history is kept in fixed-size ring buffers.
+"""
+
+import time
+import tkinter as tk
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import instrument
+
+plt.style.use('seaborn-deep')
+matplotlib.use('TkAgg')
+
+# redraws per second at most
+MAX_FPS = 10
+# rounds of history kept for the plots
+HISTORY = 1024
+
+ALGORITHMS = ("Simple", "Greedy", "Heuristic")
+COLORS = {"Simple": "tab:blue", "Greedy": "tab:green", "Heuristic": "tab:red"}
+
+
+class RingBuffer:
+    # the last capacity rows of a fixed width, read oldest first
+    def __init__(self, width, capacity=HISTORY):
+        self.data = np.zeros((capacity, width))
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, len(self.data))
+
+    def append(self, row):
+        self.data[self.count % len(self.data)] = row
+        self.count += 1
+
+    def values(self):
+        if self.count <= len(self.data):
+            return self.data[:self.count]
+        start = self.count % len(self.data)
+        return np.concatenate([self.data[start:], self.data[:start]])
+
+
+class Graph:
+    def __init__(self, master, num_nodes):
+        self.master = master
+        self.num_nodes = num_nodes
+        self.fig = Figure()
+        self.ax = self.fig.add_subplot()
+        # Tk canvas, created when the notebook tab is first shown
+        self.canvas = None
+        self.dirty = False
+        self.reset()
+
+    def reset(self):
+        # fresh axes and artists, e.g. for a new generation
+        self.ax.clear()
+        self.setup()
+        self.dirty = True
+
+    def setup(self):
+        pass
+
+    def render(self):
+        # push the latest data into the artists
+        pass
+
+    def is_shown(self):
+        return self.canvas is not None and bool(self.master.winfo_ismapped())
+
+    def show(self):
+        if self.canvas is None:
+            self.canvas = FigureCanvasTkAgg(self.fig, master=self.master)
+            self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            self.dirty = True
+        if self.dirty:
+            self.draw()
+
+    def draw(self):
+        self.render()
+        self.canvas.draw()
+        self.dirty = False
+
+
+class AodGraph(Graph):
+    def setup(self):
+        nodes = np.arange(self.num_nodes)
+        width = 0.8 / len(ALGORITHMS)
+        # one bar per node and algorithm, side by side
+        self.bars = [self.ax.bar(nodes + (k - 1) * width, np.zeros(self.num_nodes), width,
+                                 label=alg, color=COLORS[alg])
+                     for k, alg in enumerate(ALGORITHMS)]
+        self.ax.set_xticks(nodes)
+        self.ax.set_ylim(0, 100)  # set the y lim to bottom, top
+        self.ax.set_xlabel("Nodes")
+        self.ax.set_ylabel("Availability of Data percentage")
+        self.ax.legend(loc='upper center', bbox_to_anchor=(0.5, 1.15),
+                       fancybox=True, shadow=True, ncol=3)
+        self.title = self.ax.set_title("")
+        self.vals = np.zeros((len(ALGORITHMS), self.num_nodes))
+        self.rnd, self.num_of_rnds = 0, 0
+
+    def update(self, vals, rnd, num_of_rnds):
+        self.vals = np.asarray(vals)
+        self.rnd, self.num_of_rnds = rnd, num_of_rnds
+        self.dirty = True
+
+    def render(self):
+        for bars, heights in zip(self.bars, self.vals):
+            for rect, height in zip(bars, heights):
+                rect.set_height(height)
+        # Update title with current round number
+        self.title.set_text(f'Availability of data for {self.num_nodes} nodes '
+                            f'@ round {self.rnd}/{self.num_of_rnds}')
+
+
+class RanksGraph(Graph):
+    def setup(self):
+        # round, then average, min and max rank of the nodes per algorithm
+        self.history = RingBuffer(1 + 3 * len(ALGORITHMS))
+        self.mean_lines = {}
+        self.span_lines = {}
+        for alg in ALGORITHMS:
+            self.mean_lines[alg], = self.ax.plot([], [], marker='o', markersize=3,
+                                                 color=COLORS[alg], label=alg)
+            self.span_lines[alg], = self.ax.plot([], [], ls='', marker='_', mew=2,
+                                                 markersize=8, color=COLORS[alg])
+        self.ax.set_ylim(0, self.num_nodes + 1)
+        self.ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+        self.ax.set_xlabel("Rounds")
+        self.ax.set_ylabel("Node Ranks")
+        self.ax.xaxis.grid(True)
+        self.ax.yaxis.grid(True)
+        self.x_max = 1
+
+    def update(self, ranks, r_current, r_num, r_xtra, avg_ranks):
+        ranks = np.asarray(ranks)
+        self.history.append(np.concatenate(
+            [[r_current], avg_ranks, ranks.min(axis=0), ranks.max(axis=0)]))
+        self.x_max = max(self.x_max, r_num + r_xtra, r_current)
+        ax = self.ax
+
+        # Add horizontal lines at the specified round
+        if not r_xtra and r_current == r_num:
+            for alg, avg in zip(ALGORITHMS, avg_ranks):
+                ax.axhline(avg, ls='--', color=COLORS[alg])
+                ax.text(0.05, avg + 0.1, alg, color=COLORS[alg])
+
+        # one time graph setup
+        if not r_xtra and not r_current:
+            ax.axhline(self.num_nodes, ls=':', color='r')
+            ax.text(0.1, self.num_nodes + 0.1, "Max Rank", color='r')
+
+            ax.axvline(r_num, ls=':', color='r')
+            ax.text(r_num, 0.1, f"tx = {r_num}", color='r',
+                    rotation=270, transform=ax.get_xaxis_text1_transform(0)[0])
+
+            ax.set_title(
+                f'Average ranks of {self.num_nodes} decoders Vs num of transmissions')
+            ax.legend(loc='upper center', bbox_to_anchor=(0.5, 1.15),
+                      fancybox=True, shadow=True, ncol=3)
+        self.dirty = True
+
+    def mark_done(self, alg, index):
+        # vertical line where the algorithm reached full rank
+        shift = {"Simple": 0.2, "Greedy": -0.2, "Heuristic": 0}[alg]
+        self.ax.axvline(index + shift, ls='--', color=COLORS[alg])
+        self.ax.text(index + shift, 0.1, f"{alg} done", color=COLORS[alg], rotation=270,
+                     transform=self.ax.get_xaxis_text1_transform(0)[0])
+        self.dirty = True
+
+    def render(self):
+        if not len(self.history):
+            return
+        history = self.history.values()
+        rounds = history[:, 0]
+        avg, low, high = np.split(history[:, 1:], 3, axis=1)
+        for k, alg in enumerate(ALGORITHMS):
+            self.mean_lines[alg].set_data(rounds, avg[:, k])
+            # min and max markers share one line, split by nan
+            x = np.repeat(rounds, 3)
+            y = np.stack([low[:, k], high[:, k], np.full(len(low), np.nan)], axis=1).ravel()
+            self.span_lines[alg].set_data(x, y)
+        self.ax.set_xlim(rounds[0] - 0.5, self.x_max + 0.5)
+
+
+class OverheadGraph(Graph):
+    def setup(self):
+        # round, then the additive overhead in Kbits per algorithm
+        self.history = RingBuffer(1 + len(ALGORITHMS))
+        self.lines = {alg: self.ax.plot([], [], color=COLORS[alg], label=alg)[0]
+                      for alg in ALGORITHMS}
+        self.ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+        self.ax.set_xlabel("Rounds")
+        self.ax.set_ylabel("Additive_Overhead_Kbits")
+        self.ax.xaxis.grid(True)
+        self.ax.legend(loc='upper center', bbox_to_anchor=(0.5, 1.15),
+                       fancybox=True, shadow=True, ncol=3)
+        self.title = self.ax.set_title("")
+
+    def update(self, oh_vals, rnd, num_of_rnds):
+        self.history.append([rnd] + [oh_vals[alg] / 1024 for alg in ALGORITHMS])
+        # Update title with current round number
+        self.title.set_text(
+            f'Avg additive overhead of {self.num_nodes} nodes @ round {rnd}/{num_of_rnds}')
+        self.dirty = True
+
+    def mark_done(self, alg, overhead):
+        # horizontal line at the overhead when the algorithm was done
+        value = overhead / 1024
+        self.ax.axhline(value, ls=':', color=COLORS[alg])
+        self.ax.text(0.5, value + 0.1, f"{alg} done", color=COLORS[alg])
+        self.dirty = True
+
+    def render(self):
+        if not len(self.history):
+            return
+        history = self.history.values()
+        for k, line in enumerate(self.lines.values()):
+            line.set_data(history[:, 0], history[:, 1 + k])
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+
+class RenderScheduler:
+    # coalesces graph updates into at most max_fps redraws per second
+    def __init__(self, root, graphs, max_fps=MAX_FPS):
+        self.root = root
+        self.graphs = graphs
+        self.interval = 1 / max_fps if max_fps > 0 else 0
+        self.last = 0.0
+        self.pending = None
+
+    def request(self):
+        wait = self.last + self.interval - time.monotonic()
+        if wait <= 0:
+            self.render()
+        elif self.pending is None:
+            # latest data is drawn once the interval has passed
+            self.pending = self.root.after(int(wait * 1000) + 1, self._run_pending)
+
+    def _run_pending(self):
+        self.pending = None
+        self.render()
+
+    def render(self):
+        self.last = time.monotonic()
+        with instrument.phase("graph_redraw"):
+            for graph in self.graphs:
+                if graph.dirty and graph.is_shown():
+                    graph.draw()
+                    instrument.count("graph.redraws")
+
+    def cancel(self):
+        if self.pending is not None:
+            self.root.after_cancel(self.pending)
+            self.pending = None
@@ -0,0 +1,71 @@
+"""
+Stand-ins for the visualizer and the controller when no GUI is present.
+
+NCSim talks to these exactly as it talks to NCSimVisualizer and
+Controller, so the simulation runs on the data-only nodes without
+creating any Tk or turtle objects.
+"""
+
+
+class HeadlessScreen:
+    root = None
+
+    def visual_output_msg(self, message):
+        pass
+
+    def set_links(self, positions, link_src, link_dst):
+        pass
+
+    def visual_send_round(self, tx_nodes, channels):
+        pass
+
+    def clear_send_packets(self):
+        pass
+
+    def show_coverage(self, node):
+        pass
+
+    def hide_coverage(self):
+        pass
+
+    def screen_refresh(self):
+        pass
+
+    def mainloop(self):
+        pass
+
+
+class HeadlessController:
+    def __init__(self, auto_full=False):
+        self.auto_full = bool(auto_full)
+
+    def update_analysis(self, data, oh_vals=False, r_curr=0, r_num=0, r_xtra=1):
+        return False
+
+    def new_generation_cleanup(self, clear_frames=True):
+        pass
+
+    def dis_btns(self, dis_all=False):
+        pass
+
+    def dis_rnd(self):
+        pass
+
+    def enb_rnd(self):
+        pass
+
+    def enable_nxt_btn(self, btn):
+        pass
+
+    def is_continuous_run(self):
+        # always run all generations and rounds
+        return 0
+
+    def is_run_to_full(self):
+        return self.auto_full
+
+    def is_nxt_clicked(self):
+        return False
+
+    def post_click(self):
+        pass
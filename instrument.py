@@ -0,0 +1,235 @@
+"""
+Instrumentation of the simulation.
+
+Nested phase timers, call counters and packet and byte counters per
+round and per generation. It is off unless "instrument" is set in the
+Simulation section, and can be switched at any time with enable() and
+disable(); while off every call returns after one flag check.
+
+    with instrument.phase("tx_phase"):
+        ...
+    instrument.count("codec.consume_symbol")
+    instrument.traffic(rx_packets=12)
+
+The phases nest by call order, so the same name under different
+parents is reported separately. Times of generation workers are added
+under the phase that waited for them, so a phase can take longer than
+its parent. summary() gives a table and report() a dict, write() saves
+the report as JSON.
+"""
+
+import functools
+import json
+import time
+
+# per round and per generation counters
+TRAFFIC = ("tx_packets", "tx_bytes", "rx_packets", "rx_bytes", "collisions", "lost")
+
+
+class _Phase:
+    __slots__ = ("owner", "name", "start")
+
+    def __init__(self, owner, name):
+        self.owner = owner
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.owner.enter(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.owner.leave(time.perf_counter() - self.start)
+        return False
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+NO_PHASE = _NoPhase()
+
+
+class Instruments:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        # path of the open phases
+        self.stack = []
+        # phase path -> [calls, total seconds, max seconds]
+        self.phases = {}
+        # phase path -> first entry, for the report order
+        self.first_seen = {}
+        self.counters = {}
+        self.round_traffic = dict.fromkeys(TRAFFIC, 0)
+        self.generation_traffic = dict.fromkeys(TRAFFIC, 0)
+        self.rounds = []
+        self.generations = []
+
+    def phase(self, name):
+        if not self.enabled:
+            return NO_PHASE
+        return _Phase(self, name)
+
+    def enter(self, name):
+        self.stack.append(name)
+        self.first_seen.setdefault(tuple(self.stack), len(self.first_seen))
+
+    def leave(self, elapsed):
+        path = tuple(self.stack)
+        self.stack.pop()
+        stats = self.phases.get(path)
+        if stats is None:
+            self.phases[path] = [1, elapsed, elapsed]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def traffic(self, **values):
+        if self.enabled:
+            for name, value in values.items():
+                self.round_traffic[name] += int(value)
+
+    def end_round(self, gen, rnd):
+        if not self.enabled:
+            return
+        self.rounds.append({"generation": gen, "round": rnd, **self.round_traffic})
+        for name, value in self.round_traffic.items():
+            self.generation_traffic[name] += value
+        self.round_traffic = dict.fromkeys(TRAFFIC, 0)
+
+    def end_generation(self, gen):
+        if not self.enabled:
+            return
+        # extra rounds after its end are added to the same generation
+        if self.generations and self.generations[-1]["generation"] == gen:
+            for name, value in self.generation_traffic.items():
+                self.generations[-1][name] += value
+        else:
+            self.generations.append({"generation": gen, **self.generation_traffic})
+        self.generation_traffic = dict.fromkeys(TRAFFIC, 0)
+
+    def snapshot(self):
+        # everything recorded, e.g. to send back from a worker
+        return {"phases": self.phases, "first_seen": self.first_seen,
+                "counters": self.counters, "rounds": self.rounds,
+                "generations": self.generations}
+
+    def merge(self, snapshot):
+        # add a snapshot under the phases open now
+        prefix = tuple(self.stack)
+        for path in sorted(snapshot["first_seen"], key=snapshot["first_seen"].get):
+            self.first_seen.setdefault(prefix + path, len(self.first_seen))
+        for path, (calls, total, longest) in snapshot["phases"].items():
+            stats = self.phases.setdefault(prefix + path, [0, 0.0, 0.0])
+            stats[0] += calls
+            stats[1] += total
+            stats[2] = max(stats[2], longest)
+        for name, value in snapshot["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.rounds.extend(snapshot["rounds"])
+        self.generations.extend(snapshot["generations"])
+
+    def _ordered(self):
+        # parents before their children, in the order they first ran
+        def key(path):
+            return [self.first_seen.get(path[:i + 1], 0) for i in range(len(path))]
+        return sorted(self.phases, key=key)
+
+    def report(self):
+        phases = []
+        for path in self._ordered():
+            calls, total, longest = self.phases[path]
+            phases.append({"phase": "/".join(path), "calls": calls, "total_s": total,
+                           "mean_ms": total / calls * 1e3, "max_ms": longest * 1e3})
+        return {"phases": phases, "counters": dict(sorted(self.counters.items())),
+                "generations": self.generations, "rounds": self.rounds}
+
+    def summary(self):
+        lines = [f"{'phase':40} {'calls':>9} {'total s':>10} {'mean ms':>10} {'% parent':>9}"]
+        for path in self._ordered():
+            calls, total, _ = self.phases[path]
+            parent = self.phases.get(path[:-1])
+            share = f"{total / parent[1] * 100:9.1f}" if parent and parent[1] else " " * 9
+            name = "  " * (len(path) - 1) + path[-1]
+            lines.append(f"{name:40} {calls:9} {total:10.3f} {total / calls * 1e3:10.3f} {share}")
+        if self.counters:
+            lines.append("")
+            lines.append(f"{'counter':40} {'count':>9}")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:40} {value:9}")
+        if self.generations:
+            lines.append("")
+            lines.append(f"{'generation':>10} " + " ".join(f"{name:>11}" for name in TRAFFIC))
+            for row in self.generations:
+                lines.append(f"{row['generation']:10} " +
+                             " ".join(f"{row[name]:11}" for name in TRAFFIC))
+        return "\n".join(lines)
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=1)
+
+
+# instruments of this process
+instruments = Instruments()
+
+
+def enable():
+    instruments.enabled = True
+
+
+def disable():
+    instruments.enabled = False
+
+
+def is_enabled():
+    return instruments.enabled
+
+
+def phase(name):
+    return instruments.phase(name)
+
+
+def timed(name):
+    # decorator timing every call as a phase
+    def decorator(fun):
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            if not instruments.enabled:
+                return fun(*args, **kwargs)
+            with _Phase(instruments, name):
+                return fun(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    instruments.count(name, n)
+
+
+def traffic(**values):
+    instruments.traffic(**values)
+
+
+def end_round(gen, rnd):
+    instruments.end_round(gen, rnd)
+
+
+def end_generation(gen):
+    instruments.end_generation(gen)
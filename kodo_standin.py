@@ -0,0 +1,29 @@
+"""
+NumPy stand-in for the kodo bindings.
+
+Gives the NumPy codec backend of codec.py the kodo module names, so
+the "kodo" codec also runs where the kodo-python bindings are not
+built, e.g. for bench.py. It decodes correctly but is much slower than
+kodo, do not use it for results.
+"""
+
+import types
+from codec import NumpyBackend
+
+# fields are identified by their name in config.json
+field = types.SimpleNamespace(binary16="binary16", binary8="binary8",
+                              binary4="binary4", binary="binary")
+
+_backend = NumpyBackend()
+
+
+def coded_size(fifi, symbol_size):
+    return _backend.coded_size(fifi, symbol_size)
+
+
+def RLNCEncoder(fifi, symbols, symbol_size):
+    return _backend.encoder(fifi, symbols, symbol_size)
+
+
+def RLNCDecoder(fifi, symbols, symbol_size):
+    return _backend.decoder(fifi, symbols, symbol_size)
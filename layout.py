@@ -0,0 +1,31 @@
+"""
+Screen layout configuration.
+
+Kept apart from ncsim_visualizer so that headless runs can place nodes
+on the screen coordinates without importing turtle or tkinter.
+"""
+
+# Fetch Simulation and Parameters Dictionaries
+from config import CFG_SIM, CFG_PARAM
+
+# Fetch Screen related Configurations, or set default values.
+SCREEN_WIDTH = int(CFG_SIM.get('screen_width', 600))
+SCREEN_HEIGHT = int(CFG_SIM.get('screen_height', 600))
+SCREEN_HEADER = CFG_SIM.get('screen_header', "NCSim Visualizer")
+HEADER_FONT_SIZE = int(CFG_SIM.get('header_font_size', 30))
+TEXT_FONT_SIZE = int(CFG_SIM.get('text_font_size', 12))
+SCREEN_MARGIN = int(CFG_SIM.get('screen_margin', 50))
+HEAD_MARGIN = int(CFG_SIM.get('head_margin', 150))
+MESSAGE_MARGIN = int(CFG_SIM.get('message_margin', 100))
+SCREEN_BGCOLOR = CFG_SIM.get('screen_bgcolor', 'black')
+SCREEN_REFRESH_TIME = float(CFG_SIM.get("screen_refresh_time", 0.1))
+SCREEN_TITLE = CFG_SIM.get('screen_title', 'Network Coding Simulator')
+BUTTON_WIDTH = int(CFG_SIM.get('button_width', 120))
+BUTTON_HEIGHT = int(CFG_SIM.get('button_height', 30))
+
+TOTAL_WIDTH = SCREEN_WIDTH + (2 * SCREEN_MARGIN)
+TOTAL_HEIGHT = SCREEN_HEIGHT + HEAD_MARGIN + SCREEN_MARGIN
+
+# Fetch Nodes related Configurations, or set default values.
+NUM_OF_NODES = int(CFG_PARAM.get("nodes_num", '10'))
+TOPOLOGY_TYPE = CFG_PARAM.get('topology', 'random')
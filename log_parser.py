@@ -7,6 +7,7 @@ Parsing the csv from NCSim module
 # - add grid
 # - normalise rank
 
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -18,6 +19,15 @@ LOG_FILES = ["random_5_Simple_WSN_17", "random_10_Simple_WSN_13", "random_20_Sim
              "random_30_Simple_WSN_13", "random_40_Simple_WSN_17", "random_50_Simple_WSN_17"]
 LOG_FILE = "random_5_Simple_WSN_17"
 
+# streaming mode for very large result files: rows read per chunk,
+# fixed column types
+STREAMING = False
+CHUNK_ROWS = 1000000
+ALGORITHM_DTYPE = pd.CategoricalDtype(['Simple', 'Greedy', 'Heuristic'])
+AT_DONE_DTYPES = {'Generation': np.int64, 'Round': np.int64, 'Node': np.int64,
+                  'Algorithm': ALGORITHM_DTYPE, 'added_s_overhead': np.int64,
+                  'added_g_overhead': np.int64, 'added_h_overhead': np.int64}
+
 
 def prepare_at_tx():
     """
@@ -51,27 +61,55 @@ def prepare_at_done(df_at_done):
 
     RETURN
     ------
-    df_aods, df_ranks
+    df_at_done_means, df_at_done_maxes, one row per generation and algorithm
     """
-
-    gens = {g for g in df_at_done['Generation']}
-    algs = {alg for alg in df_at_done['Algorithm']}
-    at_done_means = []
-    at_done_maxes = []
-    for g in gens:
-        for alg in algs:
-            at_done_means.append(df_at_done.query(
-                f"Generation == {g} and Algorithm == '{alg}'").mean())
-            at_done_maxes.append(df_at_done.query(
-                f"Generation == {g} and Algorithm == '{alg}'").max())
-
-    df_at_done_maxes = pd.concat(at_done_maxes, axis=1).T
-    df_at_done_means = pd.concat(at_done_means, axis=1).T
-    df_at_done_means['Algorithm'] = df_at_done_maxes['Algorithm']
+    # one pass over all rows for every (generation, algorithm) group
+    groups = df_at_done.groupby(['Generation', 'Algorithm'], as_index=False, sort=True)
+    df_at_done_means = groups.mean(numeric_only=True)[df_at_done.columns]
+    df_at_done_maxes = groups.max()[df_at_done.columns]
 
     return df_at_done_means, df_at_done_maxes
 
 
+def stream_at_done(path, chunksize=CHUNK_ROWS):
+    """
+    Same as prepare_at_done of the whole file, read in chunks
+
+    Every chunk is reduced to count, sum and max per (generation,
+    algorithm) group and merged into the running partials, so memory
+    depends on the number of groups, not on the number of rows.
+
+    RETURN
+    ------
+    df_at_done_means, df_at_done_maxes
+    """
+    keys = ['Generation', 'Algorithm']
+    counts = sums = maxes = None
+    columns = None
+    for chunk in pd.read_csv(path, dtype=AT_DONE_DTYPES, chunksize=chunksize):
+        columns = chunk.columns
+        groups = chunk.groupby(keys, observed=True, sort=False)
+        parts = groups.size(), groups.sum(), groups.max()
+        if counts is None:
+            counts, sums, maxes = parts
+            continue
+        # merge into the running partials
+        counts = pd.concat([counts, parts[0]]).groupby(level=keys, observed=True).sum()
+        sums = pd.concat([sums, parts[1]]).groupby(level=keys, observed=True).sum()
+        maxes = pd.concat([maxes, parts[2]]).groupby(level=keys, observed=True).max()
+
+    if counts is None:
+        empty = pd.DataFrame(columns=list(AT_DONE_DTYPES))
+        return empty, empty
+    # same rows and order as the groupby of prepare_at_done
+    results = []
+    for df in (sums.div(counts, axis=0), maxes):
+        df = df.reset_index()
+        df['Algorithm'] = df['Algorithm'].astype(str)
+        results.append(df.sort_values(keys, ignore_index=True)[columns])
+    return tuple(results)
+
+
 def plots_at_tx(rnd_num, nodes_num):
     plt.figure()
     sns.boxplot(data=df_aods, x="Availability of Data percentage",
@@ -126,37 +164,37 @@ def plot_trends():
     plt.grid()
 
 
-def prepare_trend():
-    maxes_list_dicts = []
-    means_list_dicts = []
-    for log_file in LOG_FILES:
-        df = pd.read_csv(LOG_PATH + log_file + "_at_done.csv")
-        num_nodes = int(log_file.split("_")[1])
-        df_maxes, df_means = prepare_at_done(df)
-        list_dicts_maxes = [{
-            "Nodes": num_nodes,
-            "Rounds": rnd,
-            "Algorithm": alg
-        } for rnd, alg in zip(df_maxes['Round'], df_maxes['Algorithm'])]
-
-        list_dicts_means = [{
-            "Nodes": num_nodes,
-            "Rounds": rnd,
-            "Algorithm": alg
-        } for rnd, alg in zip(df_means['Round'], df_means['Algorithm'])]
-
-        maxes_list_dicts.append(list_dicts_maxes)
-        means_list_dicts.append(list_dicts_means)
-
-    df_master_maxes = pd.DataFrame()
-    for l in maxes_list_dicts:
-        df_master_maxes = df_master_maxes.append(
-            pd.DataFrame(l), ignore_index=True)
-
-    df_master_means = pd.DataFrame()
-    for l in means_list_dicts:
-        df_master_means = df_master_means.append(
-            pd.DataFrame(l), ignore_index=True)
+def load_trend(log_file, chunksize=None):
+    """
+    Rounds when done of one log file, per generation and algorithm,
+    streamed in chunks of chunksize rows if given
+
+    RETURN
+    ------
+    df_maxes, df_means with Nodes, Rounds and Algorithm columns
+    """
+    path = LOG_PATH + log_file + "_at_done.csv"
+    num_nodes = int(log_file.split("_")[1])
+    if chunksize:
+        df_means, df_maxes = stream_at_done(path, chunksize)
+    else:
+        df_means, df_maxes = prepare_at_done(pd.read_csv(path))
+
+    def trend(df_done):
+        return pd.DataFrame({"Nodes": num_nodes,
+                             "Rounds": df_done['Round'].to_numpy(),
+                             "Algorithm": df_done['Algorithm'].to_numpy()})
+
+    return trend(df_maxes), trend(df_means)
+
+
+def prepare_trend(log_files=LOG_FILES, workers=None, chunksize=None):
+    # all log files are loaded in parallel, then concatenated once
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        trends = list(pool.map(load_trend, log_files, [chunksize] * len(log_files)))
+
+    df_master_maxes = pd.concat([maxes for maxes, _ in trends], ignore_index=True)
+    df_master_means = pd.concat([means for _, means in trends], ignore_index=True)
 
     return df_master_maxes, df_master_means
 
@@ -179,7 +217,8 @@ if __name__ == '__main__':
     df_aods, df_ranks, configs = prepare_at_tx()
     df_done_means, df_done_maxes = prepare_at_done(df_at_done)
 
-    df_master_means, df_master_maxes = prepare_trend()
+    df_master_maxes, df_master_means = prepare_trend(
+        chunksize=CHUNK_ROWS if STREAMING else None)
 
     main(*configs)
 
@@ -1,32 +1,50 @@
-from turtle import Turtle
 import typing
 from platform import system as os_type
 from glob import glob
 import os
+import math
 import time
 import logging
 import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import pandas as pd
 import cde
+import channel
+import spatial
+import placement
+import events as ev
+import instrument
+from asynclog import AsyncLogWriter
+from recorder import Recorder
+from replay import ReplayWriter
 from node import Node
-from controller import MouseClick, Controller
-import ncsim_visualizer as ncsv
+from headless import HeadlessScreen, HeadlessController
+from config import CFG_SIM, CFG_PARAM
+import layout
 
 CFG_OS = os_type()
-# Get values from ncs visualizer
-
-# Fetch Simulation Dictionary
-CFG_SIM = ncsv.CFG_SIM
-# Fetch Parameters Dictionary
-CFG_PARAM = ncsv.CFG_PARAM
 
 # Fetch RUN related Configurations, or set default values.
 RUN_ALL = CFG_SIM.get('auto_run_all', "")
 AUTO_RUN_TO_FULL = bool(CFG_SIM.get('auto_full_aod', False))
+# binary event trace instead of text lines for the per-round logs
+EVENT_TRACE = bool(CFG_SIM.get('event_trace', False))
+# log files written by a background thread through a bounded queue
+ASYNC_LOGGING = bool(CFG_SIM.get('async_logging', False))
+# replay file of every round, for replay_player.py
+REPLAY = bool(CFG_SIM.get('replay', False))
+# worker processes running generations in parallel, cli runs only
+WORKERS = int(CFG_SIM.get('workers', 1))
+# controller graphs redraws per second at most
+MAX_FPS = float(CFG_SIM.get('max_fps', 10))
+# phase timers and counters, reported at the end of run_generations
+INSTRUMENT = bool(CFG_SIM.get('instrument', False))
+# cli runs have no screen, no controller window and no node drawings
+HEADLESS = RUN_ALL.lower() == "cli"
 
 # Fetch Nodes related Configurations, or set default values.
-TOPOLOGY_TYPE = ncsv.TOPOLOGY_TYPE
+TOPOLOGY_TYPE = layout.TOPOLOGY_TYPE
 NUM_OF_NODES = cde.NUM_OF_NODES
 SEED_VALUE = cde.SEED_VALUE
 MIN_DIST_NODES = int(CFG_PARAM.get('min_dist_between_nodes', 20))
@@ -67,24 +85,12 @@ kodo_log = logging.getLogger('kodo')
 
 LOG_FILES_NAME = f"{LOG_PATH}/{TOPOLOGY_TYPE}_{NUM_OF_NODES}_{EXP_NAME}_{SEED_VALUE}"
 
-# Start clean
-for filename in glob(f"{LOG_FILES_NAME}*"):
-    os.remove(filename)
-
-# add a file handler
-log_fh = logging.FileHandler(f'{LOG_FILES_NAME}.log', 'w+')
-kpi_fh = logging.FileHandler(f'{LOG_FILES_NAME}.csv', 'w+')
-kodo_fh = logging.FileHandler(f'{LOG_FILES_NAME}.txt', 'w+')
-# create a formatter and set the formatter for the handler.
 log_frmt = logging.Formatter('%(asctime)s:%(levelname)-10s: %(funcName)-16s: %(message)s',
                              datefmt="%Y-%m-%d %H.%M.%S")
 kpi_frmt = logging.Formatter('%(asctime)s,%(msecs)-3d,%(funcName)-17s,%(message)s',
                              datefmt="%Y-%m-%d %H:%M:%S")
 kodo_frmt = logging.Formatter('%(asctime)s\t%(funcName)-17s\t%(message)s',
                               datefmt="%Y-%m-%d %H:%M:%S")
-log_fh.setFormatter(log_frmt)
-kpi_fh.setFormatter(kpi_frmt)
-kodo_fh.setFormatter(kodo_frmt)
 
 
 def fmt_filter(record):
@@ -92,14 +98,146 @@ def fmt_filter(record):
     return True
 
 
-# add the Handler to the logger
-trace.addHandler(log_fh)
-trace.setLevel(logging.DEBUG)
-trace.addFilter(fmt_filter)
-kpi.addHandler(kpi_fh)
-kpi.setLevel(logging.DEBUG)
-kodo_log.addHandler(kodo_fh)
-kodo_log.setLevel(logging.DEBUG)
+def mark_filter(record):
+    # keeps the order of the text lines among the binary events
+    if events is not None:
+        events.mark(ev.LOGGER_IDS[record.name])
+    return True
+
+
+# binary event trace of the run, set by setup_logging
+events = None
+# file handler of every logger and the async writer, set by setup_logging
+file_handlers = {}
+log_writer = None
+
+
+def log_path(files_name, logger):
+    # text lines go next to the event trace when it is enabled
+    ext = {"trace": "log", "kpi": "csv", "kodo": "txt"}[logger.name]
+    if EVENT_TRACE and logger is not kodo_log:
+        return f"{files_name}.evt.{ext}"
+    return f"{files_name}.{ext}"
+
+
+def setup_logging(files_name=LOG_FILES_NAME):
+    # called once a simulation starts, not at import time
+    global events
+    global log_writer
+    # drop the handlers of a previous setup
+    if log_writer is not None:
+        log_writer.stop()
+        log_writer = None
+    for logger in (trace, kpi, kodo_log):
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+    for handler in file_handlers.values():
+        handler.close()
+    if events is not None:
+        events.close()
+        events = None
+
+    # Start clean
+    for filename in glob(f"{files_name}*"):
+        os.remove(filename)
+
+    # add a file handler
+    log_fh = logging.FileHandler(log_path(files_name, trace), 'w+')
+    kpi_fh = logging.FileHandler(log_path(files_name, kpi), 'w+')
+    kodo_fh = logging.FileHandler(log_path(files_name, kodo_log), 'w+')
+    # set the formatter for the handler.
+    log_fh.setFormatter(log_frmt)
+    kpi_fh.setFormatter(kpi_frmt)
+    kodo_fh.setFormatter(kodo_frmt)
+    file_handlers.update({"trace": log_fh, "kpi": kpi_fh, "kodo": kodo_fh})
+
+    # add the Handler to the logger
+    for logger in (trace, kpi, kodo_log):
+        logger.setLevel(logging.DEBUG)
+    start_logs()
+    if fmt_filter not in trace.filters:
+        trace.addFilter(fmt_filter)
+
+    if EVENT_TRACE:
+        events = ev.EventTrace(files_name, NUM_OF_NODES)
+        for logger in (trace, kpi):
+            if mark_filter not in logger.filters:
+                logger.addFilter(mark_filter)
+
+
+def flush_logs():
+    # everything logged so far is on disk afterwards
+    if log_writer is not None:
+        log_writer.flush()
+    for handler in file_handlers.values():
+        handler.flush()
+    if events is not None:
+        events.flush()
+
+
+def attach_handlers():
+    # loggers write to the files directly or through the writer queue
+    for logger in (trace, kpi, kodo_log):
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        handler = file_handlers[logger.name]
+        logger.addHandler(log_writer.handler_for(handler) if log_writer else handler)
+
+
+def start_logs():
+    # records go through the writer queue when logging asynchronously
+    global log_writer
+    if ASYNC_LOGGING and log_writer is None:
+        log_writer = AsyncLogWriter()
+        log_writer.start()
+    attach_handlers()
+
+
+def stop_logs():
+    # flush and end the background writer, e.g. before forking or exiting
+    global log_writer
+    flush_logs()
+    if log_writer is not None:
+        log_writer.stop()
+        log_writer = None
+        attach_handlers()
+
+
+def append_logs(files_name):
+    # move the logs written under files_name to the current log files
+    for logger in (trace, kpi, kodo_log):
+        path = log_path(files_name, logger)
+        handler = file_handlers[logger.name]
+        with open(path) as log_file:
+            handler.stream.write(log_file.read())
+        handler.flush()
+        os.remove(path)
+    if events is not None:
+        events.append_file(files_name)
+        os.remove(f"{files_name}.evt")
+        os.remove(f"{files_name}.aod")
+
+
+def generation_files_name(gen):
+    # fixed width, so no name is a prefix of another
+    return f"{LOG_FILES_NAME}_gen{gen:05d}"
+
+
+def generation_seed(gen):
+    # independent stream per generation, the same as
+    # SeedSequence(SEED_VALUE).spawn(gen)[gen - 1] whatever the worker count
+    return np.random.SeedSequence(
+        SEED_VALUE, spawn_key=(gen - 1,)).generate_state(4)
+
+
+# simulation shared with forked generation workers
+_worker_sim = None
+
+
+def _run_generation(gen):
+    return _worker_sim.run_gen_isolated(gen)
+
 
 # For Generations
 GENERATIONS = int(CFG_PARAM.get("generations_num", '5'))
@@ -118,6 +256,7 @@ def get_configs():
         "action_time_ms": ACT_TIME,
         "topology": TOPOLOGY_TYPE,
         "packet_size_bytes": cde.PACKET_SIZE,
+        "payload_mode": cde.PAYLOAD_MODE,
         "finite_field": cde.FINITE_FIELD,
         "SINR_loss_%": PACKET_LOSS,
         "channels": CHANNEL_NUM,
@@ -129,8 +268,18 @@ def get_configs():
 
 class NCSim:
     def __init__(self):
+        self.gui = not HEADLESS
+        if INSTRUMENT:
+            instrument.enable()
+        # open the log files of this run
+        setup_logging()
         # Call to NCSimVisualizer create Screen
-        self.screen = ncsv.NCSimVisualizer(CFG_OS)
+        if self.gui:
+            # turtle, tkinter and the plotting modules load for GUI runs only
+            import ncsim_visualizer as ncsv
+            self.screen = ncsv.NCSimVisualizer(CFG_OS)
+        else:
+            self.screen = HeadlessScreen()
         # Log operating system
         trace.info(f"running on {CFG_OS.lower()}")
         # Create place holder of the data per gen
@@ -142,24 +291,40 @@ class NCSim:
         # store AoDs
         self.full_AoD: typing.List[float] = []
 
-        # create right click listener
-        self.mclick = MouseClick(self.screen.root, self.nodes)
-        # attach popup to window
-        ncsv.set_click_listener(
-            fun=self.mclick.left_click, btn=1, add=True)
-        # attach left click
-        ncsv.set_click_listener(fun=self.mclick.popup, btn=3, add=True)
-        summ_header = [*self.nodes[0].get_statistics()]
-        # Init controller window
-        self.ctrl = Controller(
-            self.screen.root, summ_header, auto_run=RUN_ALL,
-            auto_full=AUTO_RUN_TO_FULL, **get_configs())
-
-        self.statistics_df = pd.DataFrame(columns=["Generation", "Round", "Node", "simple_AoD",
-                                          "greedy_AoD", "heuristic_AoD", "simple_rank", "greedy_rank", "heuristic_rank"])
-        self.at_done_df = pd.DataFrame(
-            columns=['Generation', 'Round', 'Node', 'Algorithm', 'added_s_overhead', 'added_g_overhead', 'added_h_overhead'])
+        if self.gui:
+            from controller import MouseClick, Controller
+            # create right click listener
+            self.mclick = MouseClick(self.screen.root, self.nodes)
+            # attach popup to window
+            ncsv.set_click_listener(
+                fun=self.mclick.left_click, btn=1, add=True)
+            # attach left click
+            ncsv.set_click_listener(fun=self.mclick.popup, btn=3, add=True)
+            summ_header = [*self.nodes[0].get_statistics()]
+            # Init controller window
+            self.ctrl = Controller(
+                self.screen.root, summ_header, auto_run=RUN_ALL,
+                auto_full=AUTO_RUN_TO_FULL, max_fps=MAX_FPS, **get_configs())
+        else:
+            self.ctrl = HeadlessController(auto_full=AUTO_RUN_TO_FULL)
+
+        # results per generation and per node done, chunked to disk
+        self.statistics_df = Recorder(
+            {"Generation": float, "Round": float, "Node": float,
+             "simple_AoD": float, "greedy_AoD": float, "heuristic_AoD": float,
+             "simple_rank": float, "greedy_rank": float, "heuristic_rank": float},
+            path=f"{LOG_FILES_NAME}_at_tx")
+        self.at_done_df = Recorder(
+            {'Generation': int, 'Round': int, 'Node': int, 'Algorithm': "U9",
+             'added_s_overhead': int, 'added_g_overhead': int, 'added_h_overhead': int},
+            path=f"{LOG_FILES_NAME}_at_done")
         self.logged = [[False, False, False] for _ in range(NUM_OF_NODES)]
+        # links between nodes, set by discover_network
+        self.adjacency = spatial.Adjacency(NUM_OF_NODES, [], [])
+        self.link_src = self.adjacency.link_src
+        self.link_dst = self.adjacency.link_dst
+        # replay recording, started by discover_network
+        self.replay = None
 
         self.current_gen = 0
         print("init done")
@@ -178,46 +343,45 @@ class NCSim:
         trace.info(f"setting topology to {TOPOLOGY_TYPE}")
         # Adjust Nodes Co-ordinates according to topology
         self.draw_network(TOPOLOGY_TYPE)
+        # Draw the placed nodes if there is a screen
+        if self.gui:
+            import ncsim_visualizer as ncsv
+            for node in self.nodes:
+                node.attach_view(ncsv.NodeView())
         # Update Screen Changes
         self.screen.screen_refresh()
 
+    @instrument.timed("placement")
     def draw_network(self, topology):
         # for case insensitivity
         topology = topology.lower()
-        draw_cursor = Turtle()                  # Create A Drawing Cursor
-        draw_cursor.color("black")
-        draw_cursor.ht()                        # Hide the Cursor
-        draw_cursor.penup()                     # Hide Cursor pen movements
 
         # IF RING TOPOLOGY
         if topology == "ring":
-            ring_radius = ncsv.SCREEN_HEIGHT/4                           # Set the Ring Radius
-            # Adjust Cursor starting position
-            draw_cursor.setposition(0, int(-ring_radius-50))
-            node_spacing = 360/NUM_OF_NODES                         # Set Node Spacing
+            ring_radius = layout.SCREEN_HEIGHT/4                           # Set the Ring Radius
+            node_spacing = 2 * math.pi / NUM_OF_NODES               # Set Node Spacing
             # Loop over the Nodes and Set Positions
             for index in range(NUM_OF_NODES):
-                # Move Cursor in circle shape by node spacing angle
-                draw_cursor.circle(ring_radius, node_spacing)
-                node_position = draw_cursor.position()              # fetch Cursor Position
-                # Locate Node where Cursor Stops
+                # Move in circle shape by node spacing angle, center at (0, -50)
+                angle = node_spacing * (index + 1)
+                node_position = (ring_radius * math.sin(angle),
+                                 -50 - ring_radius * math.cos(angle))
+                # Locate Node on the ring
                 self.nodes[index].place_node(node_position)
 
         # IF CHAIN TOPOLOGY
         elif topology == "chain":
             # Set the Chain Length
-            chain_length = ncsv.SCREEN_WIDTH
-            # Adjust Cursor starting position
-            draw_cursor.setposition(-(chain_length/2) + ncsv.SCREEN_MARGIN,
-                                    -(chain_length/2) + ncsv.SCREEN_MARGIN)
+            chain_length = layout.SCREEN_WIDTH
+            # Chain starting position
+            start = -(chain_length/2) + layout.SCREEN_MARGIN
             # To draw diagonally
-            draw_cursor.left(45)
+            step = chain_length / NUM_OF_NODES * math.cos(math.pi / 4)
             # Loop over the Nodes and Set Positions
-            for node in self.nodes:
-                # Move Cursor forward by node spacing value
-                draw_cursor.fd(chain_length/NUM_OF_NODES)
-                node_position = draw_cursor.position()     # fetch Cursor Position
-                # Locate Node where Cursor Stops
+            for index, node in enumerate(self.nodes):
+                # Move forward by node spacing value
+                node_position = (start + step * (index + 1),
+                                 start + step * (index + 1))
                 node.place_node(node_position)
 
         # IF RANDOM TOPOLOGY
@@ -251,36 +415,33 @@ class NCSim:
 
             # distributes the nodes inside the 4 quarters
             def distribute_nodes(quarters_areas):
+                # background grid over all quarters for the distance checks
+                grid = placement.DiskGrid(
+                    [quarters_areas[0]["X_RANGE"][LOW_VALUE], quarters_areas[2]["Y_RANGE"][LOW_VALUE]],
+                    [quarters_areas[1]["X_RANGE"][HIGH_VALUE], quarters_areas[0]["Y_RANGE"][HIGH_VALUE]],
+                    MIN_DIST_NODES, NUM_OF_NODES)
                 # Loop over the Nodes and Set Positions
                 for ix, nx in enumerate(self.nodes):
-                    _success = False
-                    counter = 0
-                    while not _success:
-                        _success = True
-                        counter = counter + 1
-                        # Randomly Set the Node X Position, in specific Quarter
-                        x_position = np.random.randint(
-                            quarters_areas[ix % 4]["X_RANGE"][LOW_VALUE],
-                            quarters_areas[ix % 4]["X_RANGE"][HIGH_VALUE])
-                        # Randomly Set the Node Y Position, in specific Quarter
-                        y_position = np.random.randint(
-                            quarters_areas[ix % 4]["Y_RANGE"][LOW_VALUE],
-                            quarters_areas[ix % 4]["Y_RANGE"][HIGH_VALUE])
-                        # Locate Node where Cursor Stops
-                        nx.place_node((x_position, y_position))
-                        # Check if there is overlapping nodes
-                        for _neighbor in self.nodes:
-                            # Check until reaching node index
-                            if _neighbor == nx:
-                                break
-                            if nx.distance(_neighbor) < MIN_DIST_NODES:
-                                trace.warning(
-                                    f"node {nx.node_id} was overlapping node {_neighbor.node_id}")
-                                _success = False
-                        if counter == 1000:
-                            trace.warning(
-                                "failed to create topology")
-                            return False
+                    quarter = quarters_areas[ix % 4]
+
+                    # Randomly Set the Node X and Y Positions, in specific Quarter
+                    def sample(k):
+                        return np.stack([
+                            np.random.randint(quarter["X_RANGE"][LOW_VALUE],
+                                              quarter["X_RANGE"][HIGH_VALUE], size=k),
+                            np.random.randint(quarter["Y_RANGE"][LOW_VALUE],
+                                              quarter["Y_RANGE"][HIGH_VALUE], size=k)], axis=1)
+
+                    position, rejected = placement.place(grid, sample)
+                    if position is None:
+                        trace.warning(
+                            "failed to create topology")
+                        return False
+                    if rejected:
+                        trace.warning(
+                            f"node {nx.node_id} was overlapping other nodes {rejected} times")
+                    # Locate Node at the chosen position
+                    nx.place_node(position)
                 return True
 
             # Try to place the nodes correctly
@@ -303,83 +464,86 @@ class NCSim:
                 return answer+1
 
             # Set the Chain Length
-            chain_v_length = ncsv.SCREEN_HEIGHT - ncsv.HEAD_MARGIN - ncsv.MESSAGE_MARGIN
-            chain_h_length = ncsv.SCREEN_WIDTH - ncsv.SCREEN_MARGIN * 2
-            chains = np.array_split(self.nodes, nearest_square(NUM_OF_NODES))
+            chain_v_length = layout.SCREEN_HEIGHT - layout.HEAD_MARGIN - layout.MESSAGE_MARGIN
+            chain_h_length = layout.SCREEN_WIDTH - layout.SCREEN_MARGIN * 2
+            chains = np.array_split(np.arange(NUM_OF_NODES),
+                                    nearest_square(NUM_OF_NODES))
             for index, chain in enumerate(chains):
                 v_move = (chain_v_length/len(chains)) * index
-                # Adjust Cursor starting position
-                draw_cursor.setposition(-(chain_h_length/2 + ncsv.SCREEN_MARGIN),
-                                        (chain_v_length/2) - v_move - ncsv.MESSAGE_MARGIN)
+                # Chain starting position
+                x_start = -(chain_h_length/2 + layout.SCREEN_MARGIN)
+                y_position = (chain_v_length/2) - v_move - layout.MESSAGE_MARGIN
                 # Loop over the Nodes and Set Positions
-                for node in chain:
-                    # Move Cursor forward by node spacing value
-                    draw_cursor.fd(chain_h_length/len(chain))
-                    node_position = draw_cursor.position()     # fetch Cursor Position
-                    # Locate Node where Cursor Stops
-                    node.place_node(node_position)
+                for i, node_id in enumerate(chain):
+                    # Move forward by node spacing value
+                    x_position = x_start + chain_h_length/len(chain) * (i + 1)
+                    self.nodes[node_id].place_node((x_position, y_position))
 
         # IF STAR TOPOLOGY
         elif topology == "star":
             # Node 0 is a central node reaching all other nodes
             self.nodes[0].place_node((0, 0))
-            self.nodes[0].coverage = MAX_COVERAGE = ncsv.SCREEN_HEIGHT / \
-                2 - ncsv.SCREEN_MARGIN  # Set the Ring Radius
-
-            # Adjust Cursor starting position
-            draw_cursor.setposition(0, int(-MAX_COVERAGE-50))
-            node_spacing = 360/NUM_OF_NODES                         # Set Node Spacing
+            self.nodes[0].coverage = MAX_COVERAGE = layout.SCREEN_HEIGHT / \
+                2 - layout.SCREEN_MARGIN  # Set the Ring Radius
+
+            node_spacing = 2 * math.pi / NUM_OF_NODES               # Set Node Spacing
+            # background grid for the distance checks, central node excluded
+            grid = placement.DiskGrid([-MAX_COVERAGE, -MAX_COVERAGE],
+                                      [MAX_COVERAGE, MAX_COVERAGE],
+                                      MIN_DIST_NODES, NUM_OF_NODES)
             # Loop over the Nodes and Set Positions
             for i, node in enumerate(self.nodes):
                 # skip central node
                 if i == 0:
                     continue
-                # Move Cursor in circle shape by node spacing angle
-                draw_cursor.circle(MAX_COVERAGE, node_spacing)
-                # Set heading towards the drawing cursor
-                node.setheading(node.towards(draw_cursor.pos()))
-                # init before use
-                node_position = 0
+                # Point on the outer circle, center at (0, -50)
+                angle = node_spacing * i
+                x_outer = MAX_COVERAGE * math.sin(angle)
+                y_outer = -50 - MAX_COVERAGE * math.cos(angle)
+                # Set heading from the central node towards that point
+                heading = math.atan2(y_outer, x_outer)
+
                 # Move random fd distance
-                success = False
-                while not success:
-                    success = True
-                    node_position = np.random.randint(
-                        MIN_DIST_NODES, MAX_COVERAGE)
-                    node.place_node(node_position, only_fd=True)
-                    # Check if there is overlapping nodes
-                    for index, neighbor in enumerate(self.nodes):
-                        # skip central node
-                        if index == 0:
-                            continue
-                        # Check until reaching node index
-                        if neighbor == node:
-                            break
-                        if node.distance(neighbor) < MIN_DIST_NODES:
-                            trace.warning(
-                                f"node {node.node_id} was overlapping node {neighbor.node_id}")
-                            success = False
+                def sample(k):
+                    fd = np.random.randint(MIN_DIST_NODES, MAX_COVERAGE, size=k)
+                    return np.stack([fd * math.cos(heading),
+                                     fd * math.sin(heading)], axis=1)
+
+                position, rejected = placement.place(grid, sample)
+                if position is None:
+                    # no free spot left on this ray
+                    trace.error(f"node {node.node_id} could not avoid overlapping")
+                    position = tuple(sample(1)[0].tolist())
+                    grid.add(position)
+                elif rejected:
+                    trace.warning(
+                        f"node {node.node_id} was overlapping other nodes {rejected} times")
+                node.place_node(position)
                 # Set node coverage to at least reach central node
-                node.coverage = node_position + 10
+                node.coverage = math.hypot(*position) + 10
 
         else:
             trace.error("Invalid Topology input, using Random")
             self.draw_network("random")
 
+    @instrument.timed("discovery")
     def discover_network(self):
         kpi.info(f"totn {NUM_OF_NODES},alln,topology {TOPOLOGY_TYPE}")
         # Loop over all nodes
         self.screen.visual_output_msg(f"Nodes are discovering their neighbors")
+        # Scan all nodes within the coverage area using a grid index
+        self.adjacency = spatial.Adjacency.from_positions(
+            [node.pos() for node in self.nodes],
+            [node.coverage for node in self.nodes])
         for node in self.nodes:
             # LOGGING:
             trace.info(f"node {node.node_id:2} discovering its neighbors")
-            self.screen.show_coverage(node)
-            self.screen.screen_refresh()
-            # Scan all nodes within the coverage area
-            for neighbor in self.nodes:
-                if node.distance(neighbor) < node.coverage:
-                    node.add_neighbor(neighbor)
-            time.sleep(0.01)
+            node.set_neighbors(
+                self.adjacency.neighbors(node.node_id).tolist())
+            if self.gui:
+                self.screen.show_coverage(node)
+                self.screen.screen_refresh()
+                time.sleep(0.01)
             # Check if there was no neighbors
             if len(node.neighbors) == 0:
                 # LOGGING:
@@ -391,39 +555,88 @@ class NCSim:
                 # LOGGING:
                 kpi.info(msg)
                 trace.info(msg.replace(",init,", " has "))
-            self.screen.hide_coverage()
+            if self.gui:
+                self.screen.hide_coverage()
+        # All links, each node broadcasts to its own neighbors
+        self.link_src = self.adjacency.link_src
+        self.link_dst = self.adjacency.link_dst
+        cde.set_network(self.adjacency)
+        if self.gui:
+            self.mclick.adjacency = self.adjacency
+            self.screen.set_links([node.pos() for node in self.nodes],
+                                  self.link_src, self.link_dst)
+        if REPLAY:
+            self.replay = ReplayWriter(
+                f"{LOG_FILES_NAME}.replay.npz", [node.pos() for node in self.nodes],
+                self.link_src, self.link_dst, [node.coverage for node in self.nodes],
+                get_configs())
         # Loop over all nodes
         self.screen.visual_output_msg(
             f"Please choose running method from the controller")
 
+    @instrument.timed("tx_phase")
     def tx_phase(self, r):
         # All transmit in random order
-        for node in np.random.permutation(self.nodes):
-            self.screen.visual_send_packet(node, node.get_neighbors())
-            self.screen.screen_refresh()
-            time.sleep(ncsv.SCREEN_REFRESH_TIME)
-
+        order = np.random.permutation(self.nodes)
+        for node in order:
             # Choose time and frequency channels
             freq = np.random.randint(node.ch_num)
             timeslot = np.random.randint(node.ts_num)
             # set the random chosen channel
             node.set_sending_channel(freq, timeslot)
+            # random coefficients, drawn in the same order
+            cde.draw_coefficients(node.node_id)
 
-            cde.node_broadcast(node, node.get_neighbors(), r, _logger=kpi)
+        # packets of all nodes at once
+        cde.round_packets([node.node_id for node in order])
+        for node in order:
+            cde.node_broadcast(node, node.get_neighbors(), r, _logger=kpi, _events=events)
 
             # update tx counter
             node.update_tx_counter()
-            #
-            self.screen.clear_send_packets()
-
+        tx_packets = np.count_nonzero(cde.tx_sent)
+        instrument.traffic(tx_packets=tx_packets, tx_bytes=tx_packets * cde.PACKET_BYTES)
+        if self.replay:
+            self.replay.transmissions([n.node_id for n in order],
+                                      *zip(*[n.sending_channel for n in self.nodes]))
+        # the round's transmissions, drawn at the screen's own pace
+        if self.gui:
+            with instrument.phase("draw"):
+                self.screen.visual_send_round(
+                    [n.node_id for n in self.nodes], [n.sending_channel[0] for n in self.nodes])
+                self.screen.screen_refresh()
+
+    @instrument.timed("rx_phase")
     def rx_phase(self, r):
-        # All receive in random order
-        for node in np.random.permutation(self.nodes):
-            node.sense_spectrum(PACKET_LOSS, logger=trace)
-            packets = node.get_rx_packets()
-            if packets:
-                cde.node_receive(node, packets, r, _logger=kpi)
+        # Channel effects on all transmissions at once
+        channels, timeslots = np.array(
+            [n.sending_channel for n in self.nodes]).T
+        has_heuristic = cde.tx_sent[2]
+        with instrument.phase("channel_stage"):
+            (rx_src, rx_dst, rx_heu_only), counters = channel.channel_stage(
+                self.link_src, self.link_dst, channels, timeslots, has_heuristic,
+                NUM_OF_NODES, PACKET_LOSS, CFG_KODO["duplex"],
+                CFG_KODO["rx_multi"], NODE_BUFFER_SIZE)
+        instrument.traffic(collisions=counters["collisions"].sum(),
+                           lost=counters["lost"].sum())
+        if events is not None:
+            events.channel(r, counters)
+        else:
+            channel.log_channel_stage(counters, trace)
+        if self.replay:
+            self.replay.receptions(rx_src, rx_dst)
+
+        # update rx counters
+        for i, node in enumerate(self.nodes):
+            node.update_rx_counters(
+                counters["total"][i], counters["success"][i],
+                counters["collisions"][i], counters["ignored"][i],
+                counters["lost"][i], counters["missed"][i])
 
+        # Consume the buffered packets of all nodes
+        cde.round_receive(rx_src, rx_dst, rx_heu_only, r, _logger=kpi, _events=events)
+
+    @instrument.timed("round")
     def run_round(self, r):
         # wait between generations
         while self.ctrl.is_continuous_run() > 1:
@@ -454,6 +667,7 @@ class NCSim:
         # Collect data of the round
         self.end_round(r)
 
+    @instrument.timed("generation")
     def run_gen(self, xtra=False):
         g = self.current_gen
         # LOGGING:
@@ -471,6 +685,10 @@ class NCSim:
         # LOGGING:
         trace.info(f"generation {g} begin")
         print("\nGeneration {} \n".format(g))
+        # own random stream of the generation
+        np.random.seed(generation_seed(g))
+        if events is not None:
+            events.generation = g
         # clean up before new generation
         self.gen_clean_up()
 
@@ -490,37 +708,57 @@ class NCSim:
         if self.ctrl.is_run_to_full() and self.ctrl.is_continuous_run() == 0:
             self.run_to_full()
 
+        self.generation_done()
+
+    def generation_done(self):
+        # once per generation, after its extra rounds
+        # Optional check of the decoded payloads
+        if cde.VERIFY_AOD:
+            cde.verify_aod(_logger=kpi)
+        with instrument.phase("checkpoint"):
+            self.statistics_df.checkpoint()
+            self.at_done_df.checkpoint()
+            flush_logs()
+
+    @instrument.timed("end_round")
     def end_round(self, round_num):
         # calculate data for the round
-        aods = cde.calculate_aod(round_num, _logger=kpi)
+        with instrument.phase("aod"):
+            aods = cde.calculate_aod(round_num, _logger=kpi, _events=events)
         aods_tuples = list(zip(*aods))
-        ranks = [cde.get_ranks(n.node_id) for n in self.nodes]
-        stats = [n.print_aod_percentage(
-            round_num, aods_tuples[i], ranks[i]) for i, n in enumerate(self.nodes)]
+        with instrument.phase("ranks"):
+            ranks = [cde.get_ranks(n.node_id) for n in self.nodes]
+        with instrument.phase("node_stats"):
+            stats = [n.print_aod_percentage(
+                round_num, aods_tuples[i], ranks[i]) for i, n in enumerate(self.nodes)]
         oh_nodes = list(zip(*[n.get_additive_oh() for n in self.nodes]))
         oh_dict = {
             'Simple': np.sum(oh_nodes[0]),
             'Greedy': np.sum(oh_nodes[1]),
             'Heuristic': np.sum(oh_nodes[2])
         }
-        self.ctrl.update_analysis(
-            [aods, ranks, stats], oh_dict, round_num, ROUNDS, EXTRA_RNDS)
+        with instrument.phase("controller"):
+            self.ctrl.update_analysis(
+                [aods, ranks, stats], oh_dict, round_num, ROUNDS, EXTRA_RNDS)
+        instrument.end_round(self.current_gen, round_num)
+        if self.replay:
+            self.replay.end_round(round_num, ranks, aods, list(oh_dict.values()))
 
         # Log data of interest
         if round_num == ROUNDS:
             # Store statistics at specific rounds
-            stats_df = pd.DataFrame(stats)
-            self.statistics_df = self.statistics_df.append(
-                {
-                    "Generation": self.current_gen,
-                    "Round": round_num,
-                    'Node': NUM_OF_NODES,
-                    "simple_AoD": stats_df["S_AoD_%"].mean(),
-                    "greedy_AoD": stats_df["G_AoD_%"].mean(),
-                    "heuristic_AoD": stats_df["H_AoD_%"].mean(),
-                    "simple_rank": stats_df["S_rank"].mean(),
-                    "greedy_rank": stats_df["G_rank"].mean(),
-                    "heuristic_rank": stats_df["H_rank"].mean()}, ignore_index=True)
+            def stats_mean(key):
+                return np.mean([s[key] for s in stats])
+            self.statistics_df.append(
+                Generation=self.current_gen,
+                Round=round_num,
+                Node=NUM_OF_NODES,
+                simple_AoD=stats_mean("S_AoD_%"),
+                greedy_AoD=stats_mean("G_AoD_%"),
+                heuristic_AoD=stats_mean("H_AoD_%"),
+                simple_rank=stats_mean("S_rank"),
+                greedy_rank=stats_mean("G_rank"),
+                heuristic_rank=stats_mean("H_rank"))
 
         # get AoDs
         algs = {0: "Simple", 1: "Greedy", 2: "Heuristic"}
@@ -530,25 +768,28 @@ class NCSim:
                     self.logged[i][alg] = True
                     # Store results
                     s_oh, g_oh, h_oh = n.get_additive_oh()
-                    self.at_done_df = self.at_done_df.append(
-                        {
-                            'Generation': self.current_gen,
-                            'Round': round_num,
-                            'Node': i,
-                            'Algorithm': algs[alg],
-                            'added_s_overhead': s_oh,
-                            'added_g_overhead': g_oh,
-                            'added_h_overhead': h_oh
-                        }, ignore_index=True)
+                    self.at_done_df.append(
+                        Generation=self.current_gen,
+                        Round=round_num,
+                        Node=i,
+                        Algorithm=algs[alg],
+                        added_s_overhead=s_oh,
+                        added_g_overhead=g_oh,
+                        added_h_overhead=h_oh)
 
         print(f"end round {round_num}")
 
+    @instrument.timed("end_generation")
     def end_generation(self):
         # Calculate nodes with 100% AoD
         self.full_AoD = [1 if n.last_aod == (
             100, 100, 100) else 0 for n in self.nodes]
         kpi.info(
             f"totn {NUM_OF_NODES},al{ROUNDS + EXTRA_RNDS},AoD {sum(self.full_AoD):2}/{len(self.full_AoD)} has 100%")
+        # keep the results of finished generations on disk
+        if self.replay:
+            self.replay.end_generation(self.current_gen)
+        instrument.end_generation(self.current_gen)
 
         if self.ctrl.is_continuous_run() > 1:
             self.ctrl.enable_nxt_btn('gen')
@@ -557,25 +798,80 @@ class NCSim:
 
     # Simulation Sequence
     def run_generations(self):
-        for _ in range(GENERATIONS):
-            self.current_gen += 1
-            self.run_gen()
+        with instrument.phase("generations"):
+            if WORKERS > 1 and not self.gui:
+                self.run_parallel_generations()
+            else:
+                for _ in range(GENERATIONS):
+                    self.current_gen += 1
+                    self.run_gen()
 
         # LOGGING:
         self.screen.visual_output_msg(
             f"Completed generations {GENERATIONS} x {ROUNDS} rounds")
         trace.info("run completed")
         self.ctrl.dis_btns(dis_all=True)
-        self.enable_extra_runs()
+        if self.gui:
+            self.enable_extra_runs()
 
         # Exporting files
-        self.statistics_df.to_csv(
-            f'{LOG_FILES_NAME}_at_tx.csv', index=False, mode='a',)
-        self.at_done_df.to_csv(
-            f'{LOG_FILES_NAME}_at_done.csv', index=False, mode='a')
+        with instrument.phase("export"):
+            flush_logs()
+            self.statistics_df.flush()
+            self.at_done_df.flush()
+            self.statistics_df.to_csv(f'{LOG_FILES_NAME}_at_tx.csv')
+            self.at_done_df.to_csv(f'{LOG_FILES_NAME}_at_done.csv')
+            # the CSV files have all rows, the chunk files are not needed
+            self.statistics_df.clear()
+            self.at_done_df.clear()
+        if instrument.is_enabled():
+            print(instrument.instruments.summary())
+            instrument.instruments.write(f'{LOG_FILES_NAME}.instruments.json')
 
         print("run completed")
 
+    def run_parallel_generations(self):
+        global _worker_sim
+        _worker_sim = self
+        gens = range(self.current_gen + 1, self.current_gen + GENERATIONS + 1)
+        # forked workers must not write buffered records twice, and must
+        # not inherit the writer thread, the parent logs directly meanwhile
+        stop_logs()
+
+        # workers are forked with the discovered network, results come back in order
+        ctx = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=WORKERS, mp_context=ctx) as pool:
+            for g, (stats, at_done, full_aod, timings) in zip(
+                    gens, pool.map(_run_generation, gens)):
+                instrument.instruments.merge(timings)
+                self.statistics_df.extend(stats)
+                self.at_done_df.extend(at_done)
+                self.full_AoD = full_aod
+                self.current_gen = g
+                append_logs(generation_files_name(g))
+                if self.replay:
+                    self.replay.append_file(f"{generation_files_name(g)}.replay.npz")
+                    os.remove(f"{generation_files_name(g)}.replay.npz")
+        _worker_sim = None
+        start_logs()
+
+    def run_gen_isolated(self, gen):
+        # one generation in a worker, logging to its own files
+        setup_logging(generation_files_name(gen))
+        # rows stay in memory and go back to the parent recorders
+        self.statistics_df.path = self.at_done_df.path = None
+        if self.replay:
+            # generations of the worker go to its own file, merged by the parent
+            self.replay.path = f"{generation_files_name(gen)}.replay.npz"
+        n_stats, n_done = len(self.statistics_df), len(self.at_done_df)
+        # timings of this generation only, merged by the parent
+        instrument.instruments.reset()
+        self.current_gen = gen
+        self.run_gen()
+        flush_logs()
+        return (self.statistics_df.rows_since(n_stats), self.at_done_df.rows_since(n_done),
+                self.full_AoD, instrument.instruments.snapshot())
+
     # for extra runs
     def enable_extra_runs(self):
         btn_xtr_gen, btn_xtr_rnd, btn_to_full = self.ctrl.get_xtr_btns()
@@ -592,6 +888,7 @@ class NCSim:
         EXTRA_RNDS = 0
         self.logged = [[False, False, False] for _ in range(NUM_OF_NODES)]
         self.ctrl.new_generation_cleanup()
+        self.screen.clear_send_packets()
         for n in self.nodes:
             n.clear_counters()
 
@@ -626,7 +923,10 @@ class NCSim:
                 break
 
     def end_keep_open(self):
+        flush_logs()
         self.screen.mainloop()
+        # window closed
+        stop_logs()
 
 
 if __name__ == "__main__":
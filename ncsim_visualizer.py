@@ -1,49 +1,119 @@
+import time
 from turtle import Screen, Turtle, onscreenclick
 import tkinter as tk
-import json
-
-try:
-    # Open the NCSim Config Json file
-    with open('config.json') as json_file:
-        cfg = json.loads(json_file.read())    # Read Content
-
-except Exception as e:
-    cfg = {"unk": "unk"}
-    print('failure to read config.json, running default values')
-    print(e)
-
-# Fetch Simulation Dictionary
-CFG_SIM = cfg.get('Simulation', {"unk": "unk"})
-# Fetch Parameters Dictionary
-CFG_PARAM = cfg.get('Parameters', {"unk": "unk"})
-
-# Fetch Screen related Configurations, or set default values.
-SCREEN_WIDTH = int(CFG_SIM.get('screen_width', 600))
-SCREEN_HEIGHT = int(CFG_SIM.get('screen_height', 600))
-SCREEN_HEADER = CFG_SIM.get('screen_header', "NCSim Visualizer")
-HEADER_FONT_SIZE = int(CFG_SIM.get('header_font_size', 30))
-TEXT_FONT_SIZE = int(CFG_SIM.get('text_font_size', 12))
-SCREEN_MARGIN = int(CFG_SIM.get('screen_margin', 50))
-HEAD_MARGIN = int(CFG_SIM.get('head_margin', 150))
-MESSAGE_MARGIN = int(CFG_SIM.get('message_margin', 100))
-SCREEN_BGCOLOR = CFG_SIM.get('screen_bgcolor', 'black')
-SCREEN_REFRESH_TIME = int(CFG_SIM.get("screen_refresh_time", 0.1))
-SCREEN_TITLE = CFG_SIM.get('screen_title', 'Network Coding Simulator')
-BUTTON_WIDTH = int(CFG_SIM.get('button_width', 120))
-BUTTON_HEIGHT = int(CFG_SIM.get('button_height', 30))
-
-TOTAL_WIDTH = SCREEN_WIDTH + (2 * SCREEN_MARGIN)
-TOTAL_HEIGHT = SCREEN_HEIGHT + HEAD_MARGIN + SCREEN_MARGIN
-
-# Fetch Nodes related Configurations, or set default values.
-NUM_OF_NODES = int(CFG_PARAM.get("nodes_num", '10'))
-TOPOLOGY_TYPE = CFG_PARAM.get('topology', 'random')
+import numpy as np
+# Screen layout, shared with the headless runs
+from layout import (SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_HEADER, HEADER_FONT_SIZE,
+                    TEXT_FONT_SIZE, SCREEN_MARGIN, HEAD_MARGIN, MESSAGE_MARGIN,
+                    SCREEN_BGCOLOR, SCREEN_REFRESH_TIME, TOTAL_WIDTH, TOTAL_HEIGHT,
+                    NUM_OF_NODES, TOPOLOGY_TYPE)
 
 
 def set_click_listener(**kwarg):
     onscreenclick(**kwarg)
 
 
+class NodeView(Turtle):
+    # turtle drawing of a node, attached to node.Node in GUI mode
+    def __init__(self):
+        super().__init__()
+        self.shape("circle")
+        self.penup()
+        self.speed("fastest")
+
+    def place(self, position):
+        self.goto(position)
+
+    def reset_label(self, node_id, node_color):
+        self.fillcolor(node_color)
+        self.pencolor("black")
+        self.shapesize(outline=2)
+        self.clear()
+        # node number
+        self.write(f"{node_id}  ", align="right",
+                   font=("Calibri", 12, "bold"))
+        # Print AoD
+        self.write("  0%", align="left",
+                   font=("sans", 12, "normal"))
+
+    def sleep(self, last_aod):
+        self.undo()
+        self.fillcolor("gray")
+        self.write(f"  {last_aod[0]:3.0f}%", align="left",
+                   font=("sans", 12, "normal"))
+
+    def show_aod(self, aods, is_done):
+        self.undo()
+        if is_done:
+            self.pencolor("green")
+        self.write(f"  {aods[0]:3.0f}%", align="left",
+                   font=("sans", 12, "normal"))
+
+
+# line colour per frequency channel of the transmission
+CHANNEL_COLORS = ["saddle brown", "dark orange", "dark cyan", "purple", "olive drab", "steel blue"]
+
+
+class TxRenderer:
+    """
+    Transmissions of a round as Tk canvas lines, one per link
+
+    The lines are created once per topology and only shown, hidden or
+    recoloured afterwards. Frames are drawn at most every frame_time
+    seconds, a round submitted while the previous frame is too recent
+    waits for the next frame and is replaced if a newer one comes first.
+    """
+    def __init__(self, canvas, frame_time=SCREEN_REFRESH_TIME):
+        self.canvas = canvas
+        self.frame_time = frame_time
+        self.last = 0.0
+        self.pending = None
+        self.after_id = None
+
+    def set_links(self, positions, link_src, link_dst):
+        self.canvas.delete("txlink")
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        start = positions[link_src]
+        end = positions[link_dst]
+        # stop before the receiver, as the turtle arrows did
+        length = np.maximum(np.hypot(*(end - start).T), 1e-9)
+        end = end - (end - start) * np.minimum(11 / length, 1)[:, None]
+        # turtle y axis points up, the canvas one down
+        for src, (x0, y0), (x1, y1) in zip(np.asarray(link_src).tolist(),
+                                           start.tolist(), end.tolist()):
+            self.canvas.create_line(x0, -y0, x1, -y1, width=2, arrow=tk.LAST,
+                                    fill=CHANNEL_COLORS[0], state=tk.HIDDEN,
+                                    tags=("txlink", f"tx{src}"))
+
+    def submit(self, tx_nodes, channels):
+        # newest round wins over one not drawn yet
+        self.pending = (list(tx_nodes), list(channels))
+        wait = self.last + self.frame_time - time.monotonic()
+        if wait <= 0:
+            self.draw()
+        elif self.after_id is None:
+            self.after_id = self.canvas.after(int(wait * 1000) + 1, self._run_pending)
+
+    def _run_pending(self):
+        self.after_id = None
+        self.draw()
+
+    def draw(self):
+        if self.pending is None:
+            return
+        tx_nodes, channels = self.pending
+        self.pending = None
+        self.last = time.monotonic()
+        self.canvas.itemconfigure("txlink", state=tk.HIDDEN)
+        for node_id, freq in zip(tx_nodes, channels):
+            self.canvas.itemconfigure(f"tx{node_id}", state=tk.NORMAL,
+                                      fill=CHANNEL_COLORS[freq % len(CHANNEL_COLORS)])
+
+    def clear(self):
+        self.pending = None
+        self.canvas.itemconfigure("txlink", state=tk.HIDDEN)
+
+
 class NCSimVisualizer:
     def __init__(self, cfg_os):
         # Create Screen Object
@@ -89,12 +159,8 @@ class NCSimVisualizer:
         self.coverage_cursor.pensize(2)
         self.coverage_cursor.color("saddle brown")
 
-        # Create Screen Send Packet Cursor
-        self.snd_pckt = Turtle()
-        self.snd_pckt.ht()
-        self.snd_pckt.penup()
-        self.snd_pckt.pensize(2)
-        self.snd_pckt.color("saddle brown")
+        # Transmissions of a round drawn as canvas lines
+        self.tx_renderer = TxRenderer(self.screen.getcanvas())
 
         # Call Screen Init Method
         self.screen_init()
@@ -103,13 +169,14 @@ class NCSimVisualizer:
         # Set Screen Dimensions and Coloring
         self.screen.setup(TOTAL_WIDTH, TOTAL_HEIGHT)
         self.screen.bgcolor(SCREEN_BGCOLOR)
+        # Draw the static layout at once, no animation
+        self.screen.tracer(0)
 
         self.layout_cursor.color("slate grey")
         self.layout_cursor.setposition(
             -((TOTAL_WIDTH / 2) - SCREEN_MARGIN),
             -((TOTAL_HEIGHT / 2) - SCREEN_MARGIN))
 
-        self.layout_cursor.speed(8)
         self.layout_cursor.pendown()
         self.layout_cursor.fd(SCREEN_WIDTH)
         self.layout_cursor.rt(-90)
@@ -124,7 +191,6 @@ class NCSimVisualizer:
         self.layout_cursor.fd(SCREEN_WIDTH)
 
         self.layout_cursor.penup()
-        self.layout_cursor.speed("fastest")
         self.layout_cursor.color("midnight blue")
 
         x_cor = 0
@@ -147,8 +213,8 @@ class NCSimVisualizer:
 
         self.visual_output_msg("This where the text message appears")
 
-        # Stop Auto-update Screen changes
-        self.screen.tracer(0)
+        # show the layout, then back to updates as the turtles move
+        self.screen.tracer(1)
 
     def visual_output_msg(self, message):
         x_cor = 20 - (int(SCREEN_WIDTH / 2))
@@ -158,27 +224,14 @@ class NCSimVisualizer:
         self.msg_cursor.write(f"{message}", align="Left",
                               font=("Calibri", TEXT_FONT_SIZE, "bold"))
 
-    def visual_send_packet(self, tx_node, rx_nodes):
-        # draw arrow for all neighbors
-        for rx_node in rx_nodes:
-            self.snd_pckt.setposition(tx_node.pos())
-            self.snd_pckt.pendown()
-            self.snd_pckt.setheading(self.snd_pckt.towards(rx_node.pos()))
-            self.snd_pckt.setposition(rx_node.pos())
-            self.snd_pckt.bk(11)
-
-            # Drawing arrow head
-            self.snd_pckt.left(45)
-            self.snd_pckt.backward(10)
-            self.snd_pckt.forward(10)
-            self.snd_pckt.right(90)
-            self.snd_pckt.backward(10)
-            self.snd_pckt.penup()
+    def set_links(self, positions, link_src, link_dst):
+        self.tx_renderer.set_links(positions, link_src, link_dst)
+
+    def visual_send_round(self, tx_nodes, channels):
+        self.tx_renderer.submit(tx_nodes, channels)
 
     def clear_send_packets(self):
-        self.snd_pckt.pd()
-        self.snd_pckt.clear()
-        self.snd_pckt.pu()
+        self.tx_renderer.clear()
 
     def show_coverage(self, node):
         self.coverage_cursor.goto(node.xcor(), node.ycor() - node.coverage)
@@ -0,0 +1,87 @@
+"""
+Node placement with a minimum distance between nodes.
+
+Candidates are drawn in batches and checked against the already placed
+nodes through a background grid (Poisson-disk style): the cells are
+small enough to hold at most one node, so a candidate only has to be
+compared with the nodes of the few cells around it. Without a minimum
+distance there is no grid, and if the grid would be too fine for the
+area the candidates are compared with all placed nodes instead.
+"""
+
+import math
+import numpy as np
+
+# candidates drawn per node and batch
+BATCH_SIZE = 32
+# most cells of a grid, finer grids compare with every placed node
+MAX_CELLS = 1 << 20
+
+
+class DiskGrid:
+    def __init__(self, low, high, min_dist, capacity):
+        # bounding box (x, y) of all possible positions
+        self.min_dist = min_dist
+        self.low = np.asarray(low, dtype=float)
+        self.points = np.zeros((capacity, 2))
+        self.count = 0
+        self.cells = None
+        # padded by the search reach on every side
+        self.reach = 2
+        if min_dist <= 0:
+            # every position fits
+            return
+        self.cell = min_dist / math.sqrt(2)
+        shape = np.floor((np.asarray(high, dtype=float) - self.low) / self.cell) + \
+            1 + 2 * self.reach
+        if np.prod(shape) > MAX_CELLS:
+            return
+        self.cells = np.full(tuple(shape.astype(np.int64)), -1, dtype=np.int64)
+
+        # offsets of the cells that can hold a too close node
+        span = np.arange(-self.reach, self.reach + 1)
+        self.offsets = np.stack(np.meshgrid(span, span), axis=-1).reshape(-1, 2)
+
+    def _cell_of(self, points):
+        return np.floor((points - self.low) / self.cell).astype(np.int64) + self.reach
+
+    def fits(self, candidates):
+        # candidates at least min_dist away from all placed nodes
+        candidates = np.asarray(candidates, dtype=float).reshape(-1, 2)
+        if self.min_dist <= 0 or not self.count:
+            return np.ones(len(candidates), dtype=bool)
+        if self.cells is None:
+            placed = self.points[:self.count]
+            dist = np.hypot(*(placed[None] - candidates[:, None, :]).transpose(2, 0, 1))
+            return (dist >= self.min_dist).all(axis=1)
+        near = self._cell_of(candidates)[:, None, :] + self.offsets[None]
+        owners = self.cells[near[..., 0], near[..., 1]]
+        placed = self.points[owners]
+        dist = np.hypot(*(placed - candidates[:, None, :]).transpose(2, 0, 1))
+        return ((owners < 0) | (dist >= self.min_dist)).all(axis=1)
+
+    def add(self, point):
+        if self.cells is not None:
+            cell = self._cell_of(np.asarray(point, dtype=float))
+            self.cells[cell[0], cell[1]] = self.count
+        self.points[self.count] = point
+        self.count += 1
+
+
+def place(grid, sample, max_tries=1000):
+    """
+    First sampled candidate which fits into the grid
+
+    sample(k) returns k candidate (x, y) positions, at most max_tries
+    candidates are tried, returns (position, rejected) or (None, max_tries)
+    """
+    tried = 0
+    while tried < max_tries:
+        batch = sample(min(BATCH_SIZE, max_tries - tried))
+        ok = np.flatnonzero(grid.fits(batch))
+        if len(ok):
+            position = tuple(batch[ok[0]].tolist())
+            grid.add(position)
+            return position, tried + int(ok[0])
+        tried += len(batch)
+    return None, tried
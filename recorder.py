@@ -0,0 +1,131 @@
+"""
+Columnar results recorder.
+
+Rows are stored in preallocated NumPy columns which grow by doubling up
+to a chunk size. Full chunks are flushed to numbered npz files while
+the run is in progress, so memory stays bounded over long runs, the
+rows not flushed yet can be checkpointed to a tail file, and the CSV
+files are produced from the chunks on request.
+"""
+
+import os
+from glob import glob
+
+import numpy as np
+
+# rows kept in memory before a chunk is written
+CHUNK_ROWS = 4096
+
+
+class Recorder:
+    def __init__(self, columns, path=None, chunk_rows=CHUNK_ROWS):
+        """
+        columns: {name: dtype} in output order
+        path: base name of the chunk files, None keeps all rows in memory
+        """
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in columns.items()}
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.chunks = 0
+        self.flushed_rows = 0
+        self._allocate(16)
+
+    def _allocate(self, capacity):
+        self.columns = {name: np.zeros(capacity, dtype=dtype)
+                        for name, dtype in self.dtypes.items()}
+        self.size = 0
+
+    def _grow(self, needed):
+        capacity = len(next(iter(self.columns.values())))
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for name, column in self.columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def __len__(self):
+        return self.flushed_rows + self.size
+
+    def append(self, **row):
+        self._grow(self.size + 1)
+        for name, value in row.items():
+            self.columns[name][self.size] = value
+        self.size += 1
+        if self.path and self.size >= self.chunk_rows:
+            self.flush()
+
+    def extend(self, columns):
+        # append many rows given as {name: array}, e.g. from rows_since
+        count = len(next(iter(columns.values()))) if columns else 0
+        self._grow(self.size + count)
+        for name, values in columns.items():
+            self.columns[name][self.size:self.size + count] = values
+        self.size += count
+        if self.path and self.size >= self.chunk_rows:
+            self.flush()
+
+    def column(self, name):
+        # in-memory values of one column, without a copy
+        return self.columns[name][:self.size]
+
+    def rows_since(self, start):
+        # in-memory rows from row number start on, as {name: array}
+        begin = start - self.flushed_rows
+        return {name: column[begin:self.size].copy()
+                for name, column in self.columns.items()}
+
+    def _chunk_path(self, index):
+        return f"{self.path}.{index:05d}.npz"
+
+    def flush(self):
+        # write the rows in memory as a new chunk
+        if not self.path or not self.size:
+            return
+        np.savez(self._chunk_path(self.chunks),
+                 **{name: column[:self.size] for name, column in self.columns.items()})
+        self.chunks += 1
+        self.flushed_rows += self.size
+        self._allocate(16)
+        # the tail rows are in the chunk now
+        if os.path.exists(f"{self.path}.tail.npz"):
+            os.remove(f"{self.path}.tail.npz")
+
+    def checkpoint(self):
+        # rows in memory to a tail file, replaced on every call
+        if not self.path:
+            return
+        tmp = f"{self.path}.tail.tmp.npz"
+        np.savez(tmp, **{name: column[:self.size] for name, column in self.columns.items()})
+        os.replace(tmp, f"{self.path}.tail.npz")
+
+    def frames(self):
+        # one data frame per chunk, then the rows still in memory
+        # pandas is only needed once the results are written
+        import pandas as pd
+        for index in range(self.chunks):
+            with np.load(self._chunk_path(index)) as chunk:
+                yield pd.DataFrame({name: chunk[name] for name in self.dtypes})
+        yield pd.DataFrame({name: column[:self.size]
+                            for name, column in self.columns.items()})
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.concat(list(self.frames()), ignore_index=True)
+
+    def to_csv(self, path):
+        # chunk by chunk, never all rows in memory
+        header = True
+        for frame in self.frames():
+            frame.to_csv(path, index=False, mode='w' if header else 'a', header=header)
+            header = False
+
+    def clear(self):
+        # remove the chunk files and all rows
+        if self.path:
+            for filename in glob(f"{self.path}.*.npz"):
+                os.remove(filename)
+        self.chunks = 0
+        self.flushed_rows = 0
+        self._allocate(16)
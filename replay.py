@@ -0,0 +1,182 @@
+"""
+Replay file of a run.
+
+The simulation can record every round of every generation (the order
+of the transmissions with their channel and timeslot, the receptions,
+the decoder ranks, the AoD and the additive overhead) together with the
+network layout. replay_player.py shows such a file in the GUI without
+running the codec:
+
+usage: python replay_player.py logs/random_20_Simple_WSN_17.replay.npz
+
+The file is a zip of .npy members like an npz file. The rounds of a
+generation are appended as one part when it ends, and extra rounds as
+further parts, so it can be read with np.load while the run is going.
+"""
+
+import json
+import zipfile
+
+import numpy as np
+
+VERSION = 1
+
+ALGORITHMS = ("Simple", "Greedy", "Heuristic")
+
+
+def _write_members(path, arrays, mode="a"):
+    with zipfile.ZipFile(path, mode, compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, array in arrays.items():
+            with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                np.lib.format.write_array(member, np.asanyarray(array), allow_pickle=False)
+
+
+class ReplayWriter:
+    def __init__(self, path, positions, link_src, link_dst, coverage, configs):
+        self.path = path
+        self.num_nodes = len(positions)
+        _write_members(path, {
+            "header/version": np.array(VERSION),
+            "header/positions": np.asarray(positions, dtype=float),
+            "header/link_src": np.asarray(link_src, dtype=np.int32),
+            "header/link_dst": np.asarray(link_dst, dtype=np.int32),
+            "header/coverage": np.asarray(coverage, dtype=float),
+            "header/configs": np.array(json.dumps(configs, default=str))
+        }, mode="w")
+        # parts written per generation
+        self.parts = {}
+        self._clear()
+
+    def _clear(self):
+        # rounds of the current generation
+        self.rounds = []
+        self.tx_order = []
+        self.channels = []
+        self.timeslots = []
+        self.rx_src = []
+        self.rx_dst = []
+        self.ranks = []
+        self.aod = []
+        self.overhead = []
+        self._round_tx = None
+        self._round_rx = None
+
+    def transmissions(self, order, channels, timeslots):
+        # order of the transmitting nodes, channel and timeslot per node
+        self._round_tx = (np.asarray(order, dtype=np.int32),
+                          np.asarray(channels, dtype=np.uint8),
+                          np.asarray(timeslots, dtype=np.uint8))
+
+    def receptions(self, rx_src, rx_dst):
+        self._round_rx = (np.asarray(rx_src, dtype=np.int32),
+                          np.asarray(rx_dst, dtype=np.int32))
+
+    def end_round(self, rnd, ranks, aod, overhead):
+        # round 0 and extra rounds without a tx phase record no transmissions
+        n = self.num_nodes
+        order, channels, timeslots = self._round_tx or (
+            np.full(n, -1, dtype=np.int32), np.zeros(n, dtype=np.uint8),
+            np.zeros(n, dtype=np.uint8))
+        rx_src, rx_dst = self._round_rx or (np.zeros(0, dtype=np.int32),) * 2
+        self.rounds.append(rnd)
+        self.tx_order.append(order)
+        self.channels.append(channels)
+        self.timeslots.append(timeslots)
+        self.rx_src.append(rx_src)
+        self.rx_dst.append(rx_dst)
+        self.ranks.append(np.asarray(ranks, dtype=np.uint16).reshape(n, -1))
+        # (3, N) percentages to one row per node
+        self.aod.append(np.asarray(aod, dtype=np.float32).reshape(-1, n).T)
+        self.overhead.append(np.asarray(overhead, dtype=np.int64))
+        self._round_tx = None
+        self._round_rx = None
+
+    def end_generation(self, gen):
+        # append the rounds since the last call as a part of the generation
+        if not self.rounds:
+            return
+        part = self.parts.get(gen, 0)
+        self.parts[gen] = part + 1
+        prefix = f"g{gen:05d}p{part:03d}"
+        rx_counts = [len(src) for src in self.rx_src]
+        _write_members(self.path, {
+            f"{prefix}/rounds": np.array(self.rounds, dtype=np.int32),
+            f"{prefix}/tx_order": np.stack(self.tx_order),
+            f"{prefix}/channels": np.stack(self.channels),
+            f"{prefix}/timeslots": np.stack(self.timeslots),
+            f"{prefix}/rx_offsets": np.concatenate([[0], np.cumsum(rx_counts)]).astype(np.int64),
+            f"{prefix}/rx_src": np.concatenate(self.rx_src),
+            f"{prefix}/rx_dst": np.concatenate(self.rx_dst),
+            f"{prefix}/ranks": np.stack(self.ranks),
+            f"{prefix}/aod": np.stack(self.aod),
+            f"{prefix}/overhead": np.stack(self.overhead)
+        })
+        self._clear()
+
+    def append_file(self, path):
+        # append the generations of another replay file, e.g. of a worker
+        with zipfile.ZipFile(path) as source, \
+                zipfile.ZipFile(self.path, "a", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name in source.namelist():
+                if not name.startswith("header/"):
+                    archive.writestr(name, source.read(name))
+
+
+class Replay:
+    def __init__(self, path):
+        self.path = path
+        with np.load(path) as data:
+            self.positions = data["header/positions"]
+            self.link_src = data["header/link_src"]
+            self.link_dst = data["header/link_dst"]
+            self.coverage = data["header/coverage"]
+            self.configs = json.loads(str(data["header/configs"]))
+            self.generations = sorted({int(name[1:6]) for name in data.files
+                                       if name.startswith("g")})
+        self.num_nodes = len(self.positions)
+        self._gen = None
+        self._arrays = {}
+
+    def load(self, gen):
+        # all rounds of one generation, kept until another one is loaded
+        if gen == self._gen:
+            return self._arrays
+        prefix = f"g{gen:05d}p"
+        parts = {}
+        with np.load(self.path) as data:
+            for name in data.files:
+                if name.startswith(prefix):
+                    part, field = name[len(prefix):].split("/")
+                    parts.setdefault(int(part), {})[field] = data[name]
+        arrays = {}
+        offsets = []
+        total_rx = 0
+        for part in sorted(parts):
+            for field, values in parts[part].items():
+                if field != "rx_offsets":
+                    arrays.setdefault(field, []).append(values)
+            offsets.append(parts[part]["rx_offsets"][:-1] + total_rx)
+            total_rx += parts[part]["rx_offsets"][-1]
+        self._arrays = {field: np.concatenate(values) for field, values in arrays.items()}
+        self._arrays["rx_offsets"] = np.concatenate(offsets + [[total_rx]])
+        self._gen = gen
+        return self._arrays
+
+    def num_rounds(self, gen):
+        return len(self.load(gen)["rounds"])
+
+    def frame(self, gen, index):
+        # everything recorded for one round of a generation
+        arrays = self.load(gen)
+        start, stop = arrays["rx_offsets"][index:index + 2]
+        return {
+            "round": int(arrays["rounds"][index]),
+            "tx_order": arrays["tx_order"][index],
+            "channels": arrays["channels"][index],
+            "timeslots": arrays["timeslots"][index],
+            "rx_src": arrays["rx_src"][start:stop],
+            "rx_dst": arrays["rx_dst"][start:stop],
+            "ranks": arrays["ranks"][index],
+            "aod": arrays["aod"][index],
+            "overhead": dict(zip(ALGORITHMS, arrays["overhead"][index].tolist()))
+        }
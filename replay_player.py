@@ -0,0 +1,197 @@
+"""
+Replay player.
+
+Shows a replay file recorded with "replay": true on the simulator
+screen, with a generation selector, a round slider to scrub and seek,
+and play back at an adjustable number of rounds per second. Nothing is
+decoded, the recorded ranks and AoD are shown as they were.
+
+usage: python replay_player.py logs/random_20_Simple_WSN_17.replay.npz
+"""
+
+import argparse
+import tkinter as tk
+import tkinter.ttk as ttk
+from platform import system as os_type
+
+import ncsim_visualizer as ncsv
+from graphs import AodGraph, RanksGraph, RenderScheduler
+from node import Node
+from replay import Replay
+
+# rounds per second when playing
+SPEED = 5
+
+
+class ReplayPlayer:
+    def __init__(self, path):
+        self.replay = Replay(path)
+        self.num_rounds = int(self.replay.configs.get("num_rounds", 0))
+        self.screen = ncsv.NCSimVisualizer(os_type())
+        self.root = self.screen.root
+
+        # data nodes with their turtle views at the recorded positions
+        self.nodes = []
+        for i, (position, coverage) in enumerate(zip(self.replay.positions,
+                                                     self.replay.coverage)):
+            node = Node(i, n_coverage=coverage)
+            node.place_node(position)
+            node.attach_view(ncsv.NodeView())
+            self.nodes.append(node)
+        self.screen.set_links(self.replay.positions, self.replay.link_src,
+                              self.replay.link_dst)
+
+        self.gen = self.replay.generations[0] if self.replay.generations else 0
+        self.index = -1
+        self.playing = False
+        self.after_id = None
+        self.create_controls()
+        if self.replay.generations:
+            self.seek(0)
+
+    def create_controls(self):
+        tools = tk.Toplevel(self.root, padx=10, pady=10)
+        tools.wm_title("Replay")
+
+        bar = ttk.Frame(tools)
+        bar.pack(fill=tk.X)
+        ttk.Label(bar, text='generation:').pack(side=tk.LEFT)
+        self.gen_var = tk.StringVar(value=str(self.gen))
+        gens = ttk.Combobox(bar, textvariable=self.gen_var, width=6, state="readonly",
+                            values=[str(g) for g in self.replay.generations])
+        gens.bind("<<ComboboxSelected>>", lambda _: self.select_generation(int(self.gen_var.get())))
+        gens.pack(side=tk.LEFT, padx=5)
+        self.btn_play = ttk.Button(bar, text="Play", command=self.toggle_play)
+        self.btn_play.pack(side=tk.LEFT, padx=5)
+        ttk.Button(bar, text="<", width=3,
+                   command=lambda: self.seek(self.index - 1)).pack(side=tk.LEFT)
+        ttk.Button(bar, text=">", width=3,
+                   command=lambda: self.seek(self.index + 1)).pack(side=tk.LEFT)
+        ttk.Label(bar, text='rounds/s:').pack(side=tk.LEFT, padx=(10, 0))
+        self.speed = tk.DoubleVar(value=SPEED)
+        ttk.Spinbox(bar, from_=0.5, to=100, increment=0.5, width=5,
+                    textvariable=self.speed).pack(side=tk.LEFT, padx=5)
+        self.lbl_round = ttk.Label(bar, width=16)
+        self.lbl_round.pack(side=tk.LEFT, padx=5)
+
+        # round slider, dragging it seeks
+        self.slider = tk.Scale(tools, orient=tk.HORIZONTAL, showvalue=False, from_=0,
+                               command=lambda value: self.seek(int(value)))
+        self.slider.pack(fill=tk.X, pady=5)
+
+        n = ttk.Notebook(tools)
+        aod_frame = ttk.Frame(n)
+        ranks_frame = ttk.Frame(n)
+        n.add(aod_frame, text='AoD Graph')
+        n.add(ranks_frame, text='Ranks Graph')
+        n.pack(fill=tk.BOTH, expand=1)
+        num_nodes = self.replay.num_nodes
+        self.aod_graph = AodGraph(aod_frame, num_nodes)
+        self.ranks_graph = RanksGraph(ranks_frame, num_nodes)
+        self.tab_graphs = {str(aod_frame): self.aod_graph, str(ranks_frame): self.ranks_graph}
+        n.bind("<<NotebookTabChanged>>", self.tab_changed)
+        self.scheduler = RenderScheduler(self.root, list(self.tab_graphs.values()))
+        self.update_slider()
+
+    def tab_changed(self, event):
+        graph = self.tab_graphs.get(event.widget.select())
+        if graph:
+            graph.show()
+
+    def update_slider(self):
+        rounds = self.replay.num_rounds(self.gen) if self.replay.generations else 1
+        self.slider.configure(to=max(rounds - 1, 0))
+
+    def select_generation(self, gen):
+        self.gen = gen
+        self.index = -1
+        for node in self.nodes:
+            node.clear_counters()
+        self.update_slider()
+        self.seek(0)
+
+    def feed_ranks(self, frame):
+        ranks = frame["ranks"]
+        r = frame["round"]
+        self.ranks_graph.update(ranks, r, self.num_rounds, max(r - self.num_rounds, 0),
+                                ranks.mean(axis=0).astype(int).tolist())
+
+    def seek(self, index):
+        rounds = self.replay.num_rounds(self.gen)
+        index = max(0, min(index, rounds - 1))
+        if index == self.index:
+            return
+        if index < self.index:
+            # node labels and ranks history start over
+            for node in self.nodes:
+                node.clear_counters()
+            self.index = -1
+        if index != self.index + 1 or index == 0:
+            self.ranks_graph.reset()
+            for i in range(index):
+                self.feed_ranks(self.replay.frame(self.gen, i))
+        frame = self.replay.frame(self.gen, index)
+        self.feed_ranks(frame)
+        self.index = index
+        self.show(frame)
+        if int(self.slider.get()) != index:
+            self.slider.set(index)
+
+    def show(self, frame):
+        r = frame["round"]
+        aod = frame["aod"]
+        for node, node_aod, node_ranks in zip(self.nodes, aod, frame["ranks"]):
+            node.print_aod_percentage(r, tuple(node_aod.tolist()), tuple(node_ranks.tolist()))
+
+        order = frame["tx_order"]
+        order = order[order >= 0]
+        if len(order):
+            self.screen.visual_send_round(order.tolist(), frame["channels"][order].tolist())
+        else:
+            self.screen.clear_send_packets()
+        self.screen.visual_output_msg(
+            f"Replay generation {self.gen} round {r}/{self.num_rounds}, "
+            f"{len(frame['rx_src'])} receptions")
+        self.lbl_round.configure(text=f"round {r}/{self.num_rounds}")
+        self.aod_graph.update(aod.T, r, self.num_rounds)
+        self.scheduler.request()
+        self.screen.screen_refresh()
+
+    def toggle_play(self):
+        self.playing = not self.playing
+        self.btn_play.configure(text="Pause" if self.playing else "Play")
+        if self.playing:
+            self.step()
+        elif self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def step(self):
+        self.after_id = None
+        if not self.playing:
+            return
+        if self.index + 1 < self.replay.num_rounds(self.gen):
+            self.seek(self.index + 1)
+        else:
+            # next generation, or stop at the end of the run
+            later = [g for g in self.replay.generations if g > self.gen]
+            if not later:
+                self.toggle_play()
+                return
+            self.gen_var.set(str(later[0]))
+            self.select_generation(later[0])
+        try:
+            speed = max(float(self.speed.get()), 0.01)
+        except (tk.TclError, ValueError):
+            speed = SPEED
+        self.after_id = self.root.after(int(1000 / speed), self.step)
+
+    def mainloop(self):
+        self.screen.mainloop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="NCSim replay player")
+    parser.add_argument("replay", help="replay file of a run")
+    args = parser.parse_args()
+    ReplayPlayer(args.replay).mainloop()
@@ -0,0 +1,111 @@
+"""
+Spatial index and sparse adjacency of the network.
+
+A uniform grid buckets node positions so that range and nearest
+queries only look at the cells around a point, and the links found by
+discovery are kept in compressed sparse row (CSR) form together with a
+reverse index from every receiver to the links that reach it.
+"""
+
+import numpy as np
+
+# neighbor cells of a cell, itself included
+CELL_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+class GridIndex:
+    def __init__(self, positions, cell_size):
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.cell_size = max(float(cell_size), 1e-9)
+
+        # cells shifted by one so all neighbor cells have positive keys
+        cells = np.floor(self.positions / self.cell_size).astype(np.int64)
+        self.origin = cells.min(axis=0) - 1 if len(cells) else np.zeros(2, np.int64)
+        cells -= self.origin
+        self.width = int(cells[:, 1].max()) + 2 if len(cells) else 1
+        self.keys = cells[:, 0] * self.width + cells[:, 1]
+
+        # points sorted by cell key
+        self.order = np.argsort(self.keys, kind="stable")
+        self.sorted_keys = self.keys[self.order]
+
+    def cell_key(self, point):
+        cell = np.floor(np.asarray(point, dtype=float) / self.cell_size)
+        cell = cell.astype(np.int64) - self.origin
+        return cell[0] * self.width + cell[1]
+
+    def _candidates(self, keys):
+        # all (query, point) pairs sharing a neighbor cell
+        queries, points = [], []
+        for dx, dy in CELL_OFFSETS:
+            target = keys + dx * self.width + dy
+            lo = np.searchsorted(self.sorted_keys, target, side="left")
+            hi = np.searchsorted(self.sorted_keys, target, side="right")
+            counts = hi - lo
+            q = np.repeat(np.arange(len(keys)), counts)
+            starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+            queries.append(q)
+            points.append(self.order[np.arange(len(q)) + starts])
+        return np.concatenate(queries), np.concatenate(points)
+
+    def pairs_within(self, radius):
+        """
+        All (i, j) pairs with i != j and distance(i, j) < radius[i]
+
+        radius is a scalar or one value per point, the grid cells must
+        not be smaller than the largest radius
+        """
+        radius = np.broadcast_to(np.asarray(radius, dtype=float),
+                                 len(self.positions))
+        src, dst = self._candidates(self.keys)
+        delta = self.positions[src] - self.positions[dst]
+        close = (src != dst) & (np.hypot(delta[:, 0], delta[:, 1]) < radius[src])
+        src, dst = src[close], dst[close]
+        # ordered by source then destination
+        order = np.lexsort((dst, src))
+        return src[order], dst[order]
+
+    def nearest(self, point, max_dist):
+        # nearest point closer than max_dist (<= cell size), None if none
+        q, cand = self._candidates(np.array([self.cell_key(point)]))
+        if not len(cand):
+            return None
+        dist = np.hypot(*(self.positions[cand] - np.asarray(point, dtype=float)).T)
+        best = np.argmin(dist)
+        if dist[best] >= max_dist:
+            return None
+        return int(cand[best])
+
+
+class Adjacency:
+    def __init__(self, num_nodes, src, dst):
+        # links sorted by source, as returned by GridIndex.pairs_within
+        self.num_nodes = num_nodes
+        self.link_src = np.asarray(src, dtype=np.int64)
+        self.link_dst = np.asarray(dst, dtype=np.int64)
+
+        # CSR rows: neighbors of node i are indices[indptr[i]:indptr[i+1]]
+        self.degrees = np.bincount(self.link_src, minlength=num_nodes)
+        self.indptr = np.r_[0, np.cumsum(self.degrees)]
+        self.indices = self.link_dst
+
+        # reverse index: links reaching node j are rev_links[rev_indptr[j]:rev_indptr[j+1]]
+        self.rev_links = np.argsort(self.link_dst, kind="stable")
+        self.rev_indptr = np.r_[
+            0, np.cumsum(np.bincount(self.link_dst, minlength=num_nodes))]
+
+    @classmethod
+    def from_positions(cls, positions, coverage):
+        coverage = np.broadcast_to(np.asarray(coverage, dtype=float),
+                                   len(positions))
+        cell_size = coverage.max() if len(coverage) else 1
+        src, dst = GridIndex(positions, cell_size).pairs_within(coverage)
+        return cls(len(coverage), src, dst)
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def reachers(self, j):
+        # nodes which have j as neighbor
+        links = self.rev_links[self.rev_indptr[j]:self.rev_indptr[j + 1]]
+        return self.link_src[links]
@@ -0,0 +1,138 @@
+"""
+Parameter sweep runner.
+
+Runs every combination of a grid of Parameters values as a headless
+simulation, one fresh process per job in a pool sized to the machine's
+cores, and combines the per-run results into one dataset.
+
+usage: python sweep.py sweep.json [--workers N]
+
+sweep.json example:
+{
+    "base": "config.json",
+    "output": "logs/sweep",
+    "grid": {"nodes_num": [10, 20, 40], "seed": [1, 2, 3]}
+}
+"""
+
+import argparse
+import contextlib
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from glob import glob
+
+import pandas as pd
+
+
+def expand_grid(grid):
+    # all combinations of the grid values, in the given key order
+    keys = list(grid)
+    values = [v if isinstance(v, list) else [v] for v in grid.values()]
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+def job_config(base, params, job_dir):
+    cfg = copy.deepcopy(base)
+    cfg.setdefault("Parameters", {}).update(params)
+    sim = cfg.setdefault("Simulation", {})
+    # no screen, run every generation until full AoD like cli runs
+    sim["auto_run_all"] = "cli"
+    sim["log_path"] = job_dir
+    # jobs run in parallel already, and pool processes cannot fork workers
+    sim["workers"] = 1
+    return cfg
+
+
+def run_job(job_id, cfg_path, job_dir):
+    # runs in a fresh process, the modules read NCSIM_CONFIG on import
+    os.environ["NCSIM_CONFIG"] = cfg_path
+    start = time.time()
+    with open(os.path.join(job_dir, "stdout.txt"), "w") as out, \
+            contextlib.redirect_stdout(out):
+        import main
+        main.main()
+    return job_id, time.time() - start
+
+
+def run_pool_job(job):
+    # (job id, elapsed seconds, traceback or None), a failed job does not stop the pool
+    job_id, _, job_dir = job
+    try:
+        return run_job(job_id, os.path.join(job_dir, "config.json"), job_dir) + (None,)
+    except Exception:
+        return job_id, 0.0, traceback.format_exc()
+
+
+def collect(jobs, suffix):
+    # one table of all runs with the swept values as leading columns
+    frames = []
+    for job_id, params, job_dir in jobs:
+        for path in glob(os.path.join(job_dir, f"*{suffix}")):
+            df = pd.read_csv(path)
+            for i, (key, value) in enumerate(params.items()):
+                df.insert(i, key, value)
+            df.insert(0, "job", job_id)
+            frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def run_sweep(sweep, workers=None):
+    # config module is not imported here, jobs load their own file
+    with open(sweep.get("base", "config.json")) as base_file:
+        base = json.load(base_file)
+    output = sweep.get("output", "logs/sweep")
+    combos = expand_grid(sweep.get("grid", {}))
+
+    # one directory and config file per job
+    jobs = []
+    for job_id, params in enumerate(combos):
+        job_dir = os.path.join(output, f"job_{job_id:04d}")
+        os.makedirs(job_dir, exist_ok=True)
+        cfg_path = os.path.join(job_dir, "config.json")
+        with open(cfg_path, "w") as f:
+            json.dump(job_config(base, params, job_dir), f, indent=2)
+        jobs.append((job_id, params, job_dir))
+
+    workers = workers or sweep.get("workers") or os.cpu_count()
+    print(f"sweep of {len(jobs)} jobs on {workers} workers")
+    done = []
+    failed = []
+    # a new process per job, the configuration is read at import time
+    by_id = {job[0]: job for job in jobs}
+    with multiprocessing.Pool(workers, maxtasksperchild=1) as pool:
+        for job_id, elapsed, error in pool.imap_unordered(run_pool_job, jobs):
+            job = by_id[job_id]
+            params, job_dir = job[1], job[2]
+            if error is None:
+                done.append(job)
+                print(f"[{len(done) + len(failed)}/{len(jobs)}] job {job_id} "
+                      f"{params} done in {elapsed:.1f} s")
+            else:
+                failed.append(job)
+                print(f"[{len(done) + len(failed)}/{len(jobs)}] job {job_id} "
+                      f"{params} failed")
+                with open(os.path.join(job_dir, "error.txt"), "w") as f:
+                    f.write(error)
+
+    # combined dataset of the finished jobs
+    done.sort()
+    for suffix in ("_at_tx.csv", "_at_done.csv"):
+        collect(done, suffix).to_csv(
+            os.path.join(output, f"sweep{suffix}"), index=False)
+    print(f"sweep finished, {len(done)} done, {len(failed)} failed")
+    return done, failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="NCSim parameter sweep")
+    parser.add_argument("sweep", help="sweep json file")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="parallel jobs, defaults to the number of cores")
+    args = parser.parse_args()
+    with open(args.sweep) as sweep_file:
+        run_sweep(json.load(sweep_file), args.workers)
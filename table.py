@@ -0,0 +1,147 @@
+"""
+Virtualized table.
+
+The rows are kept in a columnar Recorder and the Treeview only holds
+the few items of the visible window, whose values are replaced while
+scrolling. Sorting is an argsort of the stored column, so neither the
+number of Tk items nor the sort cost grows with Tk calls per row.
+"""
+
+import tkinter as tk
+import tkinter.ttk as ttk
+import numpy as np
+from recorder import Recorder
+
+# rows shown until the widget reports its real size
+HEIGHT = 7
+
+
+def batch_color(batch):
+    # light background colour of a batch of rows, same for every run
+    return "#%06x" % (12000000 + (batch * 7919) % 1000000)
+
+
+class VirtualTable:
+    def __init__(self, master, columns, height=HEIGHT):
+        self.names = list(columns)
+        # rows added by one call share a batch and its colour
+        self.store = Recorder({**{name: np.int64 for name in self.names}, "batch": np.int64})
+        self.batches = 0
+        # display order as row numbers, None shows the newest rows first
+        self.order = None
+        self.sort_col = None
+        self.reverse = {}
+        self.first = 0
+        self.height = height
+        self.colors = set()
+
+        # create scrollbar
+        self.scroll = ttk.Scrollbar(master, command=self.yview)
+        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        # create tree view
+        self.tree = ttk.Treeview(master, show='headings', height=height)
+        self.tree['columns'] = self.names
+        for col, name in enumerate(self.names):
+            self.tree.column(col, width=50, anchor='e')
+            self.tree.heading(col, text=name.replace('_', ' '),
+                              command=lambda _col=col: self.sort(_col))
+        self.tree.pack(expand=True, fill=tk.BOTH)
+        self._create_items()
+
+        self.tree.bind("<Configure>", self._resize)
+        self.tree.bind("<Map>", lambda _: self.refresh())
+        self.tree.bind("<MouseWheel>", lambda e: self.yview("scroll", -e.delta // 120, "units"))
+        self.tree.bind("<Button-4>", lambda _: self.yview("scroll", -1, "units"))
+        self.tree.bind("<Button-5>", lambda _: self.yview("scroll", 1, "units"))
+
+    def __len__(self):
+        return len(self.store)
+
+    def _create_items(self):
+        # the fixed pool of Tk items, one per visible row
+        self.tree.delete(*self.tree.get_children(''))
+        for i in range(self.height):
+            self.tree.insert('', 'end', iid=str(i), values=())
+
+    def _resize(self, _event):
+        # rows that fit into the widget, measured on the first item
+        box = self.tree.bbox('0')
+        if not box:
+            return
+        rows = max(1, (self.tree.winfo_height() - box[1]) // box[3])
+        if rows != self.height:
+            self.height = rows
+            self._create_items()
+            self.refresh()
+
+    def append(self, rows):
+        # rows as a list of dicts with the table columns
+        if not rows:
+            return
+        self.store.extend({**{name: np.array([row[name] for row in rows], dtype=np.int64)
+                              for name in self.names},
+                           "batch": np.full(len(rows), self.batches)})
+        self.batches += 1
+        self.order = None if self.sort_col is None else self._sorted()
+
+    def column(self, name):
+        return self.store.column(name)
+
+    def clear(self):
+        self.store.clear()
+        self.batches = 0
+        self.order = None
+        self.sort_col = None
+        self.first = 0
+        self.refresh()
+
+    def _sorted(self):
+        order = np.argsort(self.store.column(self.names[self.sort_col]), kind='stable')
+        return order[::-1] if self.reverse[self.sort_col] else order
+
+    def sort(self, col):
+        # ascending first, reverse sort next time
+        self.reverse[col] = not self.reverse.get(col, True)
+        self.sort_col = col
+        self.order = self._sorted()
+        self.first = 0
+        self.refresh()
+
+    def _rows(self, start, stop):
+        if self.order is None:
+            # newest first
+            size = len(self.store)
+            return np.arange(size - 1 - start, size - 1 - stop, -1)
+        return self.order[start:stop]
+
+    def yview(self, *args):
+        size = len(self.store)
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * size)
+        elif args[0] == "scroll":
+            step = self.height if args[2] == "pages" else 1
+            self.first += int(args[1]) * step
+        self.refresh()
+
+    def refresh(self):
+        size = len(self.store)
+        self.first = max(0, min(self.first, size - self.height))
+        if not self.tree.winfo_ismapped():
+            return
+        stop = min(size, self.first + self.height)
+        rows = self._rows(self.first, stop)
+        values = np.stack([self.store.column(name)[rows] for name in self.names], axis=1)
+        batches = self.store.column("batch")[rows]
+        for i in range(self.height):
+            if i < len(rows):
+                color = batch_color(int(batches[i]))
+                if color not in self.colors:
+                    self.tree.tag_configure(color, background=color)
+                    self.colors.add(color)
+                self.tree.item(str(i), values=values[i].tolist(), tags=color)
+            else:
+                self.tree.item(str(i), values=(), tags=())
+        if size:
+            self.scroll.set(self.first / size, stop / size)
+        else:
+            self.scroll.set(0, 1)
@@ -0,0 +1,46 @@
+"""
+rank_only runs must follow the same rounds as full payload runs of a seed.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from replay import Replay
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(tmp_path, name, **params):
+    # one headless run with replay recording, returns its replay
+    log_dir = tmp_path / name
+    log_dir.mkdir()
+    with open(os.path.join(ROOT, "config.json")) as f:
+        cfg = json.load(f)
+    cfg["Simulation"].update({"auto_run_all": "cli", "log_path": f"{log_dir}/",
+                              "workers": 1, "replay": True, "event_trace": False})
+    cfg["Parameters"].update({"nodes_num": 12, "generations_num": 2,
+                              "packet_loss_percent": 20, **params})
+    cfg_path = log_dir / "config.json"
+    cfg_path.write_text(json.dumps(cfg))
+    subprocess.run([sys.executable, "main.py"], cwd=ROOT, check=True,
+                   env={**os.environ, "NCSIM_CONFIG": str(cfg_path)},
+                   stdout=subprocess.DEVNULL)
+    return Replay(str(next(log_dir.glob("*.replay.npz"))))
+
+
+def test_rank_only_matches_full_payloads(tmp_path):
+    full = run(tmp_path, "full", payload_mode="full", decoding="kodo", codec="numpy")
+    rank_only = run(tmp_path, "rank_only", payload_mode="rank_only")
+
+    assert full.generations == rank_only.generations
+    for gen in full.generations:
+        assert full.num_rounds(gen) == rank_only.num_rounds(gen)
+        for index in range(full.num_rounds(gen)):
+            a, b = full.frame(gen, index), rank_only.frame(gen, index)
+            assert a["round"] == b["round"]
+            np.testing.assert_array_equal(a["ranks"], b["ranks"])
+            np.testing.assert_array_equal(a["aod"], b["aod"])